@@ -0,0 +1,99 @@
+"""
+Benchmark of the CNP fits on a synthetic project where sweeps reuse a few Vg (V) grids.
+
+Compares the per-sweep reference (get_CNP), the batched closed-form fit of the padded
+sweeps (fit_CNPs) and the grid-keyed fit (fit_sweeps), and checks that they agree.
+A second case jitters the measured Vg (V) of every point, so that no grid repeats, and
+checks that fit_sweeps is then no slower than fit_CNPs.
+
+Usage:
+    python benchmarks/CNP_fits.py [--sweeps 20000] [--reference 500] [--jittered 6000]
+"""
+
+import argparse
+import time
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from nanolab_processing_base.pipelines.CNP_calculations.estimators import fit_CNPs, fit_sweeps, pad_sweeps
+from nanolab_processing_base.pipelines.CNP_calculations.nodes import get_CNP
+
+# Margin on the timing of fit_sweeps against fit_CNPs on jittered grids, for timing noise
+TIMING_TOLERANCE = 1.2
+
+# Vg (V) grids of the synthetic project
+GRIDS = [
+    np.round(np.arange(-5, 5.0001, 0.05), 3),
+    np.round(np.arange(-3, 3.0001, 0.1), 3),
+    np.round(np.arange(-10, 10.0001, 0.1), 3),
+]
+
+
+def synthetic_sweeps(n_sweeps: int, seed: int = 0, jitter: float = 0.0) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Parabolic VDS (V) peaks at random gate voltages, with noise, on the GRIDS in turn.
+    With ``jitter`` (V), the measured Vg (V) of every point deviates from its grid.
+    """
+    rng = np.random.default_rng(seed)
+    sweeps = []
+    for i in range(n_sweeps):
+        vg = GRIDS[i % len(GRIDS)]
+        if jitter:
+            vg = vg + rng.normal(0, jitter, len(vg))
+        vds = 0.5 - 0.02 * (vg - rng.uniform(-2, 2)) ** 2 + rng.normal(0, 1e-4, len(vg))
+        sweeps.append((vg, vds))
+    return sweeps
+
+
+def timed(function, *args) -> Tuple[float, Tuple[np.ndarray, np.ndarray]]:
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def best_time(function, *args, repeat: int = 3) -> float:
+    return min(timed(function, *args)[0] for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sweeps", type=int, default=20000, help="Number of synthetic sweeps.")
+    parser.add_argument("--reference", type=int, default=500, help="Number of sweeps fitted with get_CNP.")
+    parser.add_argument("--jittered", type=int, default=6000, help="Number of sweeps on jittered grids.")
+    args = parser.parse_args()
+
+    sweeps = synthetic_sweeps(args.sweeps)
+
+    reference_sweeps = [pd.DataFrame({"Vg (V)": vg, "VDS (V)": vds}) for vg, vds in sweeps[:args.reference]]
+    reference_time, reference = timed(lambda: np.array([get_CNP(df) for df in reference_sweeps]).T)
+    padded_time, padded = timed(lambda: fit_CNPs(*pad_sweeps(sweeps)))
+    # The first grid-keyed run fills the memo of fit matrices, the second reuses it
+    cold_time, _ = timed(fit_sweeps, sweeps)
+    grid_time, grid = timed(fit_sweeps, sweeps)
+
+    print(f"{args.sweeps} sweeps on {len(GRIDS)} grids")
+    print(f"get_CNP (per sweep):    {reference_time / args.reference * args.sweeps:8.3f} s (extrapolated)")
+    print(f"fit_CNPs (padded):      {padded_time:8.3f} s")
+    print(f"fit_sweeps (cold memo): {cold_time:8.3f} s")
+    print(f"fit_sweeps (warm memo): {grid_time:8.3f} s")
+
+    n = args.reference
+    for name, values in [("fit_CNPs", padded), ("fit_sweeps", grid)]:
+        gate_error = np.max(np.abs(values[0][:n] - reference[0]), initial=0.0)
+        drain_error = np.max(np.abs(values[1][:n] - reference[1]), initial=0.0)
+        print(f"{name} vs get_CNP: max |dVg| = {gate_error:.2e} V, max |dVDS| = {drain_error:.2e} V")
+
+    # Grids that never repeat: every sweep would be a group of its own
+    jittered = synthetic_sweeps(args.jittered, seed=1, jitter=1e-3)
+    padded_time = best_time(lambda: fit_CNPs(*pad_sweeps(jittered)))
+    grid_time = best_time(fit_sweeps, jittered)
+    print(f"\n{args.jittered} sweeps on jittered grids")
+    print(f"fit_CNPs (padded):      {padded_time:8.3f} s")
+    print(f"fit_sweeps:             {grid_time:8.3f} s")
+    assert grid_time <= TIMING_TOLERANCE * padded_time, "fit_sweeps is slower than fit_CNPs on jittered grids"
+
+
+if __name__ == "__main__":
+    main()
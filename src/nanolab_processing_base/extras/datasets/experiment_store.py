@@ -0,0 +1,150 @@
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from kedro.io.core import AbstractDataset
+
+
+def read_experiment(filepath: str, row_group: Optional[int], columns: List[str]) -> pd.DataFrame:
+    """
+    Reads a single experiment (one row group) from an experiment store.
+
+    Args:
+        filepath (str): Path to the store's Parquet file.
+        row_group (int): Row group holding the experiment, None for an empty experiment.
+        columns (List[str]): Columns to read.
+
+    Returns:
+        pd.DataFrame: The experiment data.
+    """
+    if row_group is None:
+        return pd.DataFrame(columns=columns)
+    return pq.ParquetFile(filepath).read_row_group(row_group, columns=columns).to_pandas()
+
+
+class ExperimentStoreDataSet(AbstractDataset):
+    def __init__(self, filepath: str, load_args: Optional[Dict[str, Any]] = None):
+        """
+        Consolidated store holding every experiment of a project in a single Parquet file.
+
+        Each experiment is written as one row group of the file, and a small JSON index
+        next to it (``<filepath>.index.json``) maps every data_key to its row group and
+        columns. Loading returns a dictionary of loaders, like a ``PartitionedDataset``,
+        and each loader reads only its own row group.
+
+        All experiments share the schema of the file: a column missing from an experiment
+        is stored as nulls (and not read back), and a column stored with different types
+        across experiments is promoted to a common one (e.g. int64 and double to double).
+
+        Saving rewrites the whole file, including the experiments that did not change, so
+        its cost grows with the size of the project and not with the number of new files.
+        Use one of the per-experiment formats for projects that are ingested often.
+
+        Args:
+            filepath (str): Path to the Parquet file of the store.
+            load_args (Dict[str, Any]): Optional 'columns' to read from each experiment.
+        """
+        super().__init__()
+        self.filepath = filepath
+        self.index_filepath = f"{filepath}.index.json"
+        self.load_args = load_args or {}
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.index_filepath):
+            return {}
+        with open(self.index_filepath, "r") as f:
+            return json.load(f)
+
+    def _load(self) -> Dict[str, Callable[[], pd.DataFrame]]:
+        """
+        Load the loaders of all experiments in the store.
+
+        Returns:
+            dict: Maps each data_key to a callable returning its DataFrame.
+        """
+        selected_columns = self.load_args.get("columns")
+        loaders = {}
+        for key, entry in self._read_index().items():
+            columns = entry["columns"]
+            if selected_columns is not None:
+                columns = [column for column in selected_columns if column in columns]
+            loaders[key] = partial(read_experiment, self.filepath, entry["row_group"], columns)
+        return loaders
+
+    def _save(self, data: Dict[str, Any]) -> None:
+        """
+        Save experiments into the store, keeping the ones already stored.
+
+        The stored experiments are copied into a new file, which then replaces the store
+        together with its index, each through an atomic rename.
+
+        Args:
+            data (dict): Maps data_keys to DataFrames (or callables returning them).
+                A value of None removes the experiment from the store.
+        """
+        if not data and self._exists():
+            return
+        tables = {}
+        # Experiments kept from the current store are copied as Arrow tables
+        stored = self._read_index()
+        parquet_file = pq.ParquetFile(self.filepath) if stored and os.path.exists(self.filepath) else None
+        for key, entry in stored.items():
+            if key in data:
+                continue
+            if entry["row_group"] is None or parquet_file is None:
+                tables[key] = pa.table({column: pa.array([], pa.null()) for column in entry["columns"]})
+            else:
+                tables[key] = parquet_file.read_row_group(entry["row_group"], columns=entry["columns"])
+        for key, value in data.items():
+            if value is None:
+                continue
+            df = value() if callable(value) else value
+            tables[key] = pa.Table.from_pandas(df, preserve_index=False)
+        tables = {key: tables[key] for key in sorted(tables)}
+        schemas = [table.schema.remove_metadata() for table in tables.values()]
+        schema = pa.unify_schemas(schemas, promote_options="permissive") if schemas else pa.schema([])
+
+        index = {}
+        row_group = 0
+        os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+        temporary_filepath = f"{self.filepath}.tmp"
+        with pq.ParquetWriter(temporary_filepath, schema) as writer:
+            for key, table in tables.items():
+                index[key] = {"row_group": None, "columns": table.column_names, "rows": table.num_rows}
+                if table.num_rows == 0:
+                    continue
+                # Columns missing from this experiment are stored as nulls
+                columns = [
+                    table.column(field.name).cast(field.type) if field.name in table.column_names
+                    else pa.nulls(table.num_rows, field.type)
+                    for field in schema
+                ]
+                writer.write_table(pa.Table.from_arrays(columns, schema=schema), row_group_size=table.num_rows)
+                index[key]["row_group"] = row_group
+                row_group += 1
+
+        temporary_index_filepath = f"{self.index_filepath}.tmp"
+        with open(temporary_index_filepath, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(temporary_filepath, self.filepath)
+        os.replace(temporary_index_filepath, self.index_filepath)
+
+    def _exists(self) -> bool:
+        return os.path.exists(self.filepath) and os.path.exists(self.index_filepath)
+
+    def _describe(self) -> Dict[str, Any]:
+        """
+        Describe the dataset for catalog purposes.
+
+        Returns:
+            dict: A dictionary with dataset details.
+        """
+        return {
+            "type": "NanoLab Experiment Store",
+            "filepath": self.filepath,
+            "load_args": self.load_args,
+        }
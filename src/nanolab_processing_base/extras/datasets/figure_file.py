@@ -0,0 +1,61 @@
+from typing import Any, Dict, Optional
+import os
+
+from kedro.io.core import AbstractDataset
+
+
+class FigureFileDataSet(AbstractDataset):
+    def __init__(self, filepath: str, metadata: Optional[Dict[str, Any]] = None):
+        """
+        File of a figure rendered by a reporting node (see reporting.render_report).
+
+        Saving takes the content of the file, already rendered (possibly by another
+        process), and writes it atomically. A file that already has that content is
+        left untouched (e.g. a figure taken from the render cache). Loading returns
+        that content.
+
+        Args:
+            filepath (str): Path to the figure file.
+            metadata (Dict[str, Any]): Any arbitrary metadata, ignored by Kedro
+                (e.g. kedro-viz settings).
+        """
+        super().__init__()
+        self.filepath = filepath
+        self.metadata = metadata
+
+    def _load(self) -> bytes:
+        with open(self.filepath, "rb") as f:
+            return f.read()
+
+    def _save(self, data: bytes) -> None:
+        if self._unchanged(data):
+            return
+        os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+        temporary_filepath = f"{self.filepath}.tmp"
+        with open(temporary_filepath, "wb") as f:
+            f.write(data)
+        os.replace(temporary_filepath, self.filepath)
+
+    def _unchanged(self, data: bytes) -> bool:
+        try:
+            if os.path.getsize(self.filepath) != len(data):
+                return False
+            with open(self.filepath, "rb") as f:
+                return f.read() == data
+        except OSError:
+            return False
+
+    def _exists(self) -> bool:
+        return os.path.exists(self.filepath)
+
+    def _describe(self) -> Dict[str, Any]:
+        """
+        Describe the dataset for catalog purposes.
+
+        Returns:
+            dict: A dictionary with dataset details.
+        """
+        return {
+            "type": "Figure file",
+            "filepath": self.filepath,
+        }
@@ -0,0 +1,45 @@
+from typing import Any, Dict, Optional
+import os
+
+from kedro.io.core import AbstractDataset
+
+from nanolab_processing_base.manifest import load_manifest, save_manifest
+
+
+class ManifestDataSet(AbstractDataset):
+    def __init__(self, filepath: str, metadata: Optional[Dict[str, Any]] = None):
+        """
+        JSON manifest of the raw files of a project (see nanolab_processing_base.manifest).
+
+        Loads as an empty manifest while the file does not exist (e.g. on a fresh
+        checkout, before the first ingestion), and is saved atomically.
+
+        Args:
+            filepath (str): Path to the JSON file.
+            metadata (Dict[str, Any]): Any arbitrary metadata, ignored by Kedro
+                (e.g. kedro-viz settings).
+        """
+        super().__init__()
+        self.filepath = filepath
+        self.metadata = metadata
+
+    def _load(self) -> Dict[str, Dict]:
+        return load_manifest(self.filepath)
+
+    def _save(self, data: Dict[str, Dict]) -> None:
+        save_manifest(data, self.filepath)
+
+    def _exists(self) -> bool:
+        return os.path.exists(self.filepath)
+
+    def _describe(self) -> Dict[str, Any]:
+        """
+        Describe the dataset for catalog purposes.
+
+        Returns:
+            dict: A dictionary with dataset details.
+        """
+        return {
+            "type": "Manifest",
+            "filepath": self.filepath,
+        }
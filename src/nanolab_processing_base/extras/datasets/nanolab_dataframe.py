@@ -1,10 +1,16 @@
+import hashlib
+import json
 import os
 import re
+import threading
 import warnings
 import logging
-from typing import Dict, List, Tuple, Type
+from functools import partial
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, TextIO, Tuple
 import pandas as pd
-from kedro.framework.session import KedroSession
+import yaml
+
+from nanolab_processing_base.projects import project_path
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -41,50 +47,71 @@ def get_data_key(path):
     return os.path.join(folder, file_name)
 
 
-def load_catalog_item(dataset_name: str) -> Dict:
-    """
-    Load a dataset from Kedro's catalog.
-    """
-    with KedroSession.create() as session:
-        context = session.load_context()
-        catalog = context.catalog
-        try:
-            dataset = catalog.load(dataset_name)
-            logger.info(f"Loaded dataset: {dataset_name}")
-            return dataset
-        except KeyError:
-            logger.error(f"Dataset '{dataset_name}' not found in catalog.")
-            raise
+DEFAULT_PROCEDURES_FILEPATH = "conf/base/parameters.yml"
 
+# Version of the parsing code, part of the parse cache keys.
+# Bump it whenever a change to this module changes the parsed properties or data.
+PARSER_VERSION = 1
 
-_cached_procedures = None
+_procedures_cache: Dict[str, Dict] = {}
+_procedures_lock = threading.Lock()
 
 
-def get_procedures() -> Dict:
+def _reset_procedures_lock() -> None:
     """
-    Lazily load the 'procedures' catalog item.
+    Replaces the cache lock in a forked child, where it could have been copied
+    while held by another thread of the parent.
     """
-    global _cached_procedures
-    if _cached_procedures is None:
-        _cached_procedures = load_catalog_item("params:procedures")
-    return _cached_procedures
+    global _procedures_lock
+    _procedures_lock = threading.Lock()
 
 
-def unix_time_to_datetime(unix_time_str: str) -> pd.Timestamp:
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_procedures_lock)
+
+
+def load_procedures(filepath: str = DEFAULT_PROCEDURES_FILEPATH) -> Dict:
     """
-    Converts a Unix timestamp string into a pandas datetime object.
+    Loads the procedure schemas from the 'procedures' key of a parameters YAML file.
+
+    The result is cached per file path, so each process reads the file at most once.
+    Unlike loading 'params:procedures' from the catalog, this does not create a
+    KedroSession, which keeps dataset loads cheap in worker processes.
 
     Args:
-        unix_time_str (str): Unix timestamp as a string (e.g., "1731364225.4285064").
+        filepath (str): Path to the YAML file holding the 'procedures' key, relative
+            to the project root (see ``project_path``) unless absolute.
 
     Returns:
-        pd.Timestamp: Corresponding pandas datetime object.
+        Dict: The procedure schemas, keyed by procedure name.
     """
-    try:
-        unix_time = float(unix_time_str)
-        return pd.to_datetime(unix_time, unit='s')
-    except ValueError as e:
-        raise ValueError(f"Invalid Unix timestamp: {unix_time_str}") from e
+    with _procedures_lock:
+        if filepath not in _procedures_cache:
+            try:
+                with open(project_path() / filepath, "r") as file:
+                    _procedures_cache[filepath] = yaml.safe_load(file)["procedures"]
+            except FileNotFoundError:
+                raise FileNotFoundError(f"The procedures file '{filepath}' was not found.")
+            except KeyError:
+                raise KeyError(f"No 'procedures' key found in '{filepath}'.")
+            logger.debug(f"Loaded procedures from {filepath}")
+        return _procedures_cache[filepath]
+
+
+def register_procedures(procedures: Dict, filepath: str = DEFAULT_PROCEDURES_FILEPATH) -> None:
+    """
+    Seeds the procedures cache for a file path with already resolved schemas,
+    e.g. 'params:procedures' taken from the catalog when it is created.
+    """
+    with _procedures_lock:
+        _procedures_cache[filepath] = procedures
+
+
+def get_procedures() -> Dict:
+    """
+    Lazily load the procedure schemas from the default parameters file.
+    """
+    return load_procedures()
 
 
 def parse_info_line(info_line: str) -> Dict[str, str]:
@@ -138,41 +165,45 @@ def make_dict_from_parsed_data(list_of_lines: List[str]) -> Dict[str, str]:
     return {**dict_of_info, **dict_rest_of_lines}
 
 
-def read_comment_lines(file_path: str) -> Tuple[Dict[str, str], int]:
+def read_header(file: TextIO) -> Tuple[str, Dict[str, str], int]:
     """
-    Reads and processes comment lines from the beginning of a file.
+    Reads the '#' header block of an open pymeasure file in a single pass.
+
+    Reading stops at the first non-comment line (the column names), and the
+    stream is left positioned at the start of that line, so it can be handed
+    directly to ``pd.read_csv`` without reopening the file.
+
+    Args:
+        file (TextIO): A text stream positioned at the beginning of the file.
+
+    Returns:
+        Tuple[str, Dict[str, str], int]: The procedure name found in the first line,
+        the parsed key-value properties and the number of comment lines read.
     """
     comment_lines = []
-    current_line = 0
-    try:
-        with open(file_path, 'r') as file:
-            for line in file:
-                if line.strip().startswith('#'):
-                    current_line += 1
-                if line.strip().startswith('#\t'):
-                    comment_lines.append(line.strip().replace("#\t", ""))
-    except FileNotFoundError:
-        raise FileNotFoundError(f"The file '{file_path}' was not found.")
-    except Exception as e:
-        raise Exception(f"An error occurred while processing the file: {e}")
-
-    if comment_lines:
-        return make_dict_from_parsed_data(comment_lines), current_line
-    else:
-        return {}, 0
+    header = 0
 
+    offset = file.tell()
+    line = file.readline()
+    procedure = procedure_from_line(line.strip())
+    while line.strip().startswith('#'):
+        header += 1
+        if line.strip().startswith('#\t'):
+            comment_lines.append(line.strip().replace("#\t", ""))
+        offset = file.tell()
+        line = file.readline()
+    # Rewind to the column names line so the CSV parser starts there
+    file.seek(offset)
 
-def determine_procedure(path: str) -> str:
-    """
-    Extracts and processes content enclosed within angle brackets ("<" and ">")
-    from the first line of a CSV file corresponding to an experiment.
-    """
-    if not path.endswith(".csv"):
-        raise ValueError(f"The file '{path}' is not a CSV. Please provide a valid .csv file.")
+    properties = make_dict_from_parsed_data(comment_lines) if comment_lines else {}
+    return procedure, properties, header
 
-    with open(path, "r") as file:
-        first_line = file.readline().strip()
 
+def procedure_from_line(first_line: str) -> str:
+    """
+    Extracts the procedure name enclosed within angle brackets ("<" and ">")
+    in the first line of a pymeasure file.
+    """
     match = re.search(r"<(.*?)>", first_line)
     if match:
         content = match.group(1)
@@ -186,71 +217,230 @@ def string_to_bool(string_bool: str) -> bool:
     return string_bool == "True"
 
 
-def parse_metadata(key, value, how_to_process):
+def float_with_unit(value: str) -> float:
+    """Parses a float followed by an optional unit, e.g. "0.5 V"."""
+    return float(value.split(" ")[0])
+
+
+def unix_time(unix_time_str: str) -> float:
     """
-    Parses a metadata value based on the specified processing type.
+    Parses a Unix timestamp string into seconds. The conversion to datetime is
+    deferred to a single vectorized pass over the consolidated properties.
     """
-    if how_to_process == "float":
-        return float(value.split(" ")[0])
-    if how_to_process == "int":
-        return int(value)
-    if how_to_process == "bool":
-        return string_to_bool(value)
-    if how_to_process == "str":
-        return value
-    if how_to_process == "datetime":
-        return unix_time_to_datetime(value)
-    if how_to_process == "float_no_unit":
-        return float(value)
+    try:
+        return float(unix_time_str)
+    except ValueError as e:
+        raise ValueError(f"Invalid Unix timestamp: {unix_time_str}") from e
+
+
+def _identity(value: str) -> str:
+    return value
 
-    raise ValueError(f"Unhandled metadata key: {key}")
 
+# Converters for each type name used in the procedure schemas
+CONVERTERS: Dict[str, Callable[[str], Any]] = {
+    "float": float_with_unit,
+    "int": int,
+    "bool": string_to_bool,
+    "str": _identity,
+    "datetime": unix_time,
+    "float_no_unit": float,
+}
 
-def get_keys(procedure: str) -> List[str]:
+
+class ProcedureSchema(NamedTuple):
+    """
+    A procedure definition compiled into lookup tables.
+
+    Attributes:
+        name: Name of the procedure (e.g. "VVg").
+        converters: Maps every known header key to the function that parses its value.
+        keys: The set of header keys allowed for the procedure.
+        datetime_keys: Header keys that hold Unix timestamps.
+        dtypes: dtype mapping of the data columns, passed to ``pd.read_csv``.
+        fingerprint: Hash of the procedure definition.
+    """
+    name: str
+    converters: Dict[str, Callable[[str], Any]]
+    keys: frozenset
+    datetime_keys: Tuple[str, ...]
+    dtypes: Dict[str, str]
+    fingerprint: str
+
+
+def compile_procedure(name: str, definition: Dict) -> ProcedureSchema:
+    """
+    Compiles a single procedure definition ('Parameters', 'Metadata' and 'Data')
+    into a ``ProcedureSchema``.
     """
-    Retrieves a list of keys associated with a specific procedure.
+    header_types = definition["Parameters"] | definition["Metadata"]
+    converters = {}
+    for key, how_to_process in header_types.items():
+        if how_to_process not in CONVERTERS:
+            raise ValueError(f"Unhandled type '{how_to_process}' for key '{key}' in procedure '{name}'.")
+        converters[key] = CONVERTERS[how_to_process]
+
+    return ProcedureSchema(
+        name=name,
+        converters=converters,
+        keys=frozenset(converters),
+        datetime_keys=tuple(key for key, how in header_types.items() if how == "datetime"),
+        dtypes=dict(definition["Data"]),
+        fingerprint=procedures_fingerprint({name: definition}),
+    )
+
+
+def procedures_fingerprint(procedures: Dict) -> str:
+    """
+    Returns a stable hash of the procedure schemas.
+    """
+    serialized = json.dumps(procedures, sort_keys=True, default=str)
+    return hashlib.sha1(serialized.encode()).hexdigest()
+
+
+_compiled_cache: Dict[str, Dict[str, ProcedureSchema]] = {}
+_last_compiled: Tuple[Optional[Dict], Optional[Dict[str, ProcedureSchema]]] = (None, None)
+
+
+def compile_procedures(procedures: Dict) -> Dict[str, ProcedureSchema]:
     """
-    procedures = get_procedures()
-    if procedure not in procedures:
+    Compiles all procedure definitions, once per distinct set of schemas.
+
+    The most recently used ``procedures`` object is recognised by identity; any
+    other object (e.g. a copy made for each partition) is looked up by its fingerprint.
+    """
+    global _last_compiled
+    last_procedures, last_schemas = _last_compiled
+    if procedures is last_procedures:
+        return last_schemas
+
+    fingerprint = procedures_fingerprint(procedures)
+    schemas = _compiled_cache.get(fingerprint)
+    if schemas is None:
+        schemas = {name: compile_procedure(name, definition) for name, definition in procedures.items()}
+        _compiled_cache[fingerprint] = schemas
+    _last_compiled = (procedures, schemas)
+    return schemas
+
+
+def get_schema(procedure: str, procedures: Optional[Dict] = None) -> ProcedureSchema:
+    """
+    Retrieves the compiled schema of a specific procedure.
+    """
+    if procedures is None:
+        procedures = get_procedures()
+    schemas = compile_procedures(procedures)
+    if procedure not in schemas:
         raise KeyError(f"Procedure '{procedure}' not found in procedures.")
+    return schemas[procedure]
 
-    parameters = list(procedures[procedure]["Parameters"].keys())
-    metadata = list(procedures[procedure]["Metadata"].keys())
 
-    if not isinstance(parameters, list) or not isinstance(metadata, list):
-        raise TypeError(f"Expected 'Parameters' and 'Metadata' to be lists in procedure '{procedure}'.")
+def datetime_keys(procedures: Optional[Dict] = None) -> List[str]:
+    """
+    Lists the header keys declared as 'datetime' in any procedure.
+    """
+    if procedures is None:
+        procedures = get_procedures()
+    keys = []
+    for schema in compile_procedures(procedures).values():
+        keys.extend(key for key in schema.datetime_keys if key not in keys)
+    return keys
+
 
-    return parameters + metadata
+def convert_datetime_columns(props: pd.DataFrame, procedures: Optional[Dict] = None) -> pd.DataFrame:
+    """
+    Converts the Unix timestamp columns of a consolidated properties DataFrame
+    to datetimes, one vectorized conversion per column.
+    """
+    for key in datetime_keys(procedures):
+        if key in props.columns and pd.api.types.is_numeric_dtype(props[key]):
+            props[key] = pd.to_datetime(props[key], unit="s")
+    return props
 
 
-def make_props_data(path: str) -> Tuple[pd.Series, pd.DataFrame]:
+def parse_props(path: str, file: TextIO, procedures: Optional[Dict] = None) -> Tuple[pd.Series, ProcedureSchema, int]:
     """
-    Parses properties and reads data from a file based on the procedure definition.
+    Parses the header block of an open pymeasure file into a properties Series.
+
+    The stream is left at the column names line (see ``read_header``).
+
+    Returns:
+        Tuple[pd.Series, ProcedureSchema, int]: The properties, the compiled schema of the
+        file's procedure and the number of header lines.
     """
-    dictionary_found_properties, header = read_comment_lines(path)
+    procedure, dictionary_found_properties, header = read_header(file)
 
-    procedure = determine_procedure(path)
-    procedures = get_procedures()
-    keys = get_keys(procedure)
-    procedure_dict = procedures[procedure]["Parameters"] | procedures[procedure]["Metadata"]
+    schema = get_schema(procedure, procedures)
+    converters = schema.converters
     props_dict = {}
 
-    for key in dictionary_found_properties:
-        if key in keys:
-            props_dict[key] = parse_metadata(key, dictionary_found_properties[key], procedure_dict[key])
-        else:
+    for key, value in dictionary_found_properties.items():
+        if key not in converters:
             raise KeyError(f"Key '{key}' is missing in the configuration file of {procedure}.")
+        props_dict[key] = converters[key](value)
 
     props_dict["data_key"] = get_data_key(path)
     props_dict["Procedure type"] = procedure
-    props_series = pd.Series(props_dict)
+    return pd.Series(props_dict), schema, header
 
-    dtype_mapping = procedures[procedure]["Data"]
+
+def read_body(path: str, file: TextIO, dtype_mapping: Dict[str, str]) -> pd.DataFrame:
+    """
+    Reads the data body of an open pymeasure file, from the column names line on
+    (where ``parse_props`` leaves the stream).
+    """
     try:
-        data = pd.read_csv(path, header=header, dtype=dtype_mapping)
+        return pd.read_csv(file, dtype=dtype_mapping)
     except ValueError as e:
         raise ValueError(f"Error in reading {path} with dtype mapping: {dtype_mapping}") from e
 
-    return props_series, data
 
+def read_data(path: str, header: int, dtype_mapping: Dict[str, str]) -> pd.DataFrame:
+    """
+    Reads the data body of a pymeasure file whose header block has ``header`` lines.
+    """
+    try:
+        return pd.read_csv(path, header=header, dtype=dtype_mapping)
+    except ValueError as e:
+        raise ValueError(f"Error in reading {path} with dtype mapping: {dtype_mapping}") from e
 
+
+def make_props(path: str, procedures: Optional[Dict] = None) -> Tuple[pd.Series, Callable[[], pd.DataFrame]]:
+    """
+    Parses the properties of a file and defers reading its data.
+
+    Only the header block is read. The data body is read when the returned loader
+    is called.
+
+    Returns:
+        Tuple[pd.Series, Callable[[], pd.DataFrame]]: The properties and a (picklable)
+        callable that reads the data.
+    """
+    if not path.endswith(".csv"):
+        raise ValueError(f"The file '{path}' is not a CSV. Please provide a valid .csv file.")
+
+    with open(path, "r") as file:
+        props_series, schema, header = parse_props(path, file, procedures)
+
+    return props_series, partial(read_data, path, header, schema.dtypes)
+
+
+def make_props_data(path: str, procedures: Optional[Dict] = None) -> Tuple[pd.Series, pd.DataFrame]:
+    """
+    Parses properties and reads data from a file based on the procedure definition.
+
+    The file is opened once: the header block is parsed up to the column names and
+    the same stream is then handed to ``pd.read_csv`` for the data body.
+    If ``procedures`` is not given, the schemas are read from the default parameters file.
+
+    'datetime' keys such as 'Start time' are returned as Unix seconds; use
+    ``convert_datetime_columns`` on the consolidated properties to turn them into datetimes.
+    """
+    if not path.endswith(".csv"):
+        raise ValueError(f"The file '{path}' is not a CSV. Please provide a valid .csv file.")
+
+    with open(path, "r") as file:
+        props_series, schema, _ = parse_props(path, file, procedures)
+        data = read_body(path, file, schema.dtypes)
+
+    return props_series, data
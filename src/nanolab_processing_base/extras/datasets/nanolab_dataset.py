@@ -1,20 +1,57 @@
-from typing import Any, Dict
-from nanolab_processing_base.extras.datasets.nanolab_dataframe import make_props_data, get_procedures
+from typing import Any, Dict, Optional
+import io
+from nanolab_processing_base.extras.datasets.nanolab_dataframe import (
+    DEFAULT_PROCEDURES_FILEPATH,
+    load_procedures,
+    make_props,
+    make_props_data,
+    parse_props,
+    read_body,
+)
+from nanolab_processing_base.extras.datasets.parse_cache import (
+    DEFAULT_PARSE_CACHE_DIR,
+    DEFAULT_PARSE_CACHE_MAX_BYTES,
+    get_parse_cache,
+)
+from nanolab_processing_base.manifest import content_hash
 import pickle
 from kedro.io.core import AbstractDataset
 
 
 class NanoLabDataSet(AbstractDataset):
-    def __init__(self, filepath: str, catalog: Any = None):
+    def __init__(
+        self,
+        filepath: str,
+        procedures: Optional[Dict] = None,
+        procedures_filepath: str = DEFAULT_PROCEDURES_FILEPATH,
+        lazy: bool = False,
+        cache_dir: Optional[str] = DEFAULT_PARSE_CACHE_DIR,
+        cache_max_bytes: int = DEFAULT_PARSE_CACHE_MAX_BYTES,
+        catalog: Any = None,
+    ):
         """
         Custom dataset for NanoLab data.
 
         Args:
             filepath (str): The path to the data file.
+            procedures (Dict): Optional procedure schemas. When omitted they are read
+                (once per process) from ``procedures_filepath``.
+            procedures_filepath (str): YAML file holding the 'procedures' key.
+            lazy (bool): If True, loading only parses the header and returns a loader
+                for the data instead of the DataFrame.
+            cache_dir (str): Folder of the parse cache, None to disable it. Parsed files
+                are cached by content, parser, pandas and pyarrow versions and procedure
+                schema (eager mode only).
+            cache_max_bytes (int): Size cap of the parse cache, in bytes.
             catalog (Any): Optional Kedro catalog object or similar placeholder.
         """
         super().__init__()
         self.filepath = filepath
+        self.procedures = procedures
+        self.procedures_filepath = procedures_filepath
+        self.lazy = lazy
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
         self.catalog = catalog
         self.props = None
         self.data = None
@@ -25,12 +62,49 @@ class NanoLabDataSet(AbstractDataset):
 
         Returns:
             tuple: A tuple of (properties, data), where properties is a pandas Series
-            and data is a pandas DataFrame.
+            and data is a pandas DataFrame. 'datetime' keys such as 'Start time' are Unix
+            seconds, converted for the whole project by ``separate_nanolab_dataset``.
+            In lazy mode, data is a callable that reads the DataFrame when called.
         """
-        procedures = get_procedures()  # Ensure procedures are loaded
-        self.props, self.data = make_props_data(self.filepath)
+        procedures = self.procedures
+        if procedures is None:
+            procedures = load_procedures(self.procedures_filepath)
+        if self.lazy:
+            self.props, self.data = make_props(self.filepath, procedures)
+        elif self.cache_dir is None:
+            self.props, self.data = make_props_data(self.filepath, procedures)
+        else:
+            self.props, self.data = self._load_cached(procedures)
         return self.props, self.data
 
+    def _load_cached(self, procedures: Dict) -> Any:
+        """
+        Parse the file through the parse cache.
+
+        The file is read once: its content is hashed for the key and parsed from
+        memory, and the header parsed for the key is the one used on a miss.
+        """
+        if not self.filepath.endswith(".csv"):
+            raise ValueError(f"The file '{self.filepath}' is not a CSV. Please provide a valid .csv file.")
+        with open(self.filepath, "rb") as f:
+            content = f.read()
+
+        file = io.TextIOWrapper(io.BytesIO(content))
+        props, schema, _ = parse_props(self.filepath, file, procedures)
+
+        cache = get_parse_cache(self.cache_dir, self.cache_max_bytes)
+        key = cache.key(content_hash(content), schema.fingerprint)
+        cached = cache.get(key)
+        if cached is not None:
+            cached_props, data = cached
+            # The same content may be stored under another name
+            cached_props["data_key"] = props["data_key"]
+            return cached_props, data
+
+        data = read_body(self.filepath, file, schema.dtypes)
+        cache.put(key, (props, data))
+        return props, data
+
     def _save(self, data: Any) -> None:
         """
         Save the dataset to a pickle file.
@@ -51,4 +125,6 @@ class NanoLabDataSet(AbstractDataset):
         return {
             "type": "NanoLab Data Frame",
             "filepath": self.filepath,
+            "lazy": self.lazy,
+            "cache_dir": self.cache_dir,
         }
@@ -0,0 +1,49 @@
+from typing import Any, Dict
+import os
+
+import pandas as pd
+from kedro.io.core import AbstractDataset
+
+
+class OptionalParquetDataSet(AbstractDataset):
+    def __init__(self, filepath: str):
+        """
+        Parquet file that loads as an empty DataFrame while it does not exist.
+
+        Meant for tables written by a node and read back by the same node on the next
+        run (e.g. caches of results), through a second catalog entry on the same file.
+
+        Args:
+            filepath (str): Path to the Parquet file.
+        """
+        super().__init__()
+        self.filepath = filepath
+
+    def _load(self) -> pd.DataFrame:
+        if not os.path.exists(self.filepath):
+            return pd.DataFrame()
+        return pd.read_parquet(self.filepath)
+
+    def _save(self, data: pd.DataFrame) -> None:
+        """
+        Save the table, replacing the file atomically.
+        """
+        os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+        temporary_filepath = f"{self.filepath}.tmp"
+        data.to_parquet(temporary_filepath, index=False)
+        os.replace(temporary_filepath, self.filepath)
+
+    def _exists(self) -> bool:
+        return os.path.exists(self.filepath)
+
+    def _describe(self) -> Dict[str, Any]:
+        """
+        Describe the dataset for catalog purposes.
+
+        Returns:
+            dict: A dictionary with dataset details.
+        """
+        return {
+            "type": "Optional Parquet",
+            "filepath": self.filepath,
+        }
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import pandas as pd
+import pyarrow
+
+from nanolab_processing_base.extras.datasets.nanolab_dataframe import PARSER_VERSION
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARSE_CACHE_DIR = "data/02_intermediate/parse_cache"
+DEFAULT_PARSE_CACHE_MAX_BYTES = 1 << 30  # 1 GiB
+
+# Once over the size cap, entries are evicted down to this fraction of it,
+# so that the cache directory is not scanned again after every write
+EVICTION_TARGET = 0.9
+
+CACHE_SUFFIX = ".pkl"
+
+
+class ParseCache:
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_PARSE_CACHE_MAX_BYTES):
+        """
+        Content-addressed cache of parsed pymeasure files.
+
+        Every entry is the pickled ``(props, data)`` pair of one raw file, stored as
+        ``<directory>/<key>.pkl``. Keys combine the content hash of the raw file, the
+        parser, pandas and pyarrow versions and the fingerprint of the file's procedure
+        schema, so entries never go stale: they are only evicted, least recently used
+        first, once the cache grows over ``max_bytes``. The cap is approximate when several processes
+        write to the same directory.
+
+        Args:
+            directory (str): Folder holding the entries.
+            max_bytes (int): Size cap of the folder, in bytes.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None  # Estimated size of the folder, scanned lazily
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(content_hash: str, schema_fingerprint: str) -> str:
+        """
+        Builds the key of the entry of a raw file. The pandas and pyarrow versions are
+        part of it, as the pickled DataFrames depend on them.
+
+        Args:
+            content_hash (str): Hash of the raw file content.
+            schema_fingerprint (str): Fingerprint of the procedure schema of the file.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{content_hash}:{PARSER_VERSION}:{pd.__version__}:{pyarrow.__version__}:{schema_fingerprint}".encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key: str) -> Optional[Tuple[pd.Series, pd.DataFrame]]:
+        """
+        Returns the cached ``(props, data)`` pair of ``key``, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable parse cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: str, value: Tuple[pd.Series, pd.DataFrame]) -> None:
+        """
+        Stores the ``(props, data)`` pair of ``key``, then evicts the least recently
+        used entries if the cache is over its size cap. Errors are logged, not raised.
+        """
+        path = self._path(key)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            logger.warning(f"Could not write parse cache entry {path}: {e}")
+            self._remove(temporary_path)
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _scan(self) -> Tuple[List[Tuple[float, int, str]], int]:
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(CACHE_SUFFIX):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except FileNotFoundError:
+            pass
+        return entries, total
+
+    def _evict(self) -> None:
+        entries, total = self._scan()
+        target = self.max_bytes * EVICTION_TARGET
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+                evicted += 1
+        self._size = total
+        logger.debug(f"Evicted {evicted} parse cache entries from {self.directory}")
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+_parse_caches: Dict[Tuple[str, int], ParseCache] = {}
+# A forked child gets fresh caches, without locks possibly held by other threads of the parent
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_parse_caches.clear)
+
+
+def get_parse_cache(directory: str, max_bytes: int = DEFAULT_PARSE_CACHE_MAX_BYTES) -> ParseCache:
+    """
+    Returns the cache of ``directory``, shared by every dataset of the process
+    (so its size estimate is shared as well).
+    """
+    cache = _parse_caches.get((directory, max_bytes))
+    if cache is None:
+        cache = _parse_caches.setdefault((directory, max_bytes), ParseCache(directory, max_bytes))
+    return cache
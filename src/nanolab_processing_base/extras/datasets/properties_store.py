@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional, Sequence
+import os
+import shutil
+
+import pandas as pd
+from kedro.io.core import AbstractDataset
+
+# Columns the store is partitioned by, one folder level each
+PARTITION_COLUMNS = ["chip", "sample"]
+
+
+class PropertiesStore:
+    def __init__(self, path: str):
+        """
+        Reader of a properties store written by PropertiesStoreDataSet.
+
+        Args:
+            path (str): Folder of the store.
+        """
+        self.path = path
+
+    def read(self, columns: Optional[List[str]] = None, filters: Optional[Sequence] = None) -> pd.DataFrame:
+        """
+        Reads the rows and columns of the store that are needed, in a single read.
+
+        Filters on the partition columns ('chip', 'sample') skip whole folders, and
+        filters on the other columns skip the row groups that cannot match.
+
+        Args:
+            columns (List[str]): Columns to read. All of them by default.
+            filters (Sequence): Row filters, in the pyarrow format, e.g.
+                ``[("chip", "==", "CHIP1"), ("sample", "in", ["A", "B"])]``, or a list
+                of such lists, any of which may match (see sample_filters).
+
+        Returns:
+            pd.DataFrame: The rows, with 'chip' and 'sample' as categoricals.
+        """
+        return pd.read_parquet(self.path, engine="pyarrow", columns=columns, filters=_as_tuples(filters))
+
+
+def _as_tuples(filters: Optional[Sequence]) -> Optional[List]:
+    """Conditions of ``filters`` as tuples, as pyarrow expects (YAML gives lists)."""
+    if not filters:
+        return None
+    if isinstance(filters[0][0], (list, tuple)):
+        return [[tuple(condition) for condition in conditions] for conditions in filters]
+    return [tuple(condition) for condition in filters]
+
+
+def sample_filters(samples: Dict[str, List[str]]) -> List[List[tuple]]:
+    """
+    Filters selecting the given samples of each chip, e.g. ``{"CHIP1": ["A", "B"]}``.
+    """
+    return [[("chip", "==", chip), ("sample", "in", list(letters))] for chip, letters in samples.items()]
+
+
+class PropertiesStoreDataSet(AbstractDataset):
+    def __init__(self, path: str, metadata: Optional[Dict[str, Any]] = None):
+        """
+        Properties of every project in one typed Parquet table, partitioned by chip and
+        sample (``<path>/chip=CHIP1/sample=A/...``).
+
+        Saving takes the table with its 'chip' and 'sample' columns and replaces the
+        whole store. Loading does not read anything: it returns a PropertiesStore, from
+        which each node reads only the rows and columns it needs.
+
+        Args:
+            path (str): Folder of the store.
+            metadata (Dict[str, Any]): Any arbitrary metadata, ignored by Kedro
+                (e.g. kedro-viz settings).
+        """
+        super().__init__()
+        self.path = path
+        self.metadata = metadata
+
+    def _load(self) -> PropertiesStore:
+        return PropertiesStore(self.path)
+
+    def _save(self, data: pd.DataFrame) -> None:
+        """
+        Write the store to a temporary folder, then swap it with the previous one.
+        """
+        temporary_path = f"{self.path}.tmp"
+        previous_path = f"{self.path}.old"
+        shutil.rmtree(temporary_path, ignore_errors=True)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data.to_parquet(temporary_path, engine="pyarrow", partition_cols=PARTITION_COLUMNS, index=False)
+
+        shutil.rmtree(previous_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.replace(self.path, previous_path)
+        os.replace(temporary_path, self.path)
+        shutil.rmtree(previous_path, ignore_errors=True)
+
+    def _exists(self) -> bool:
+        return os.path.isdir(self.path)
+
+    def _describe(self) -> Dict[str, Any]:
+        """
+        Describe the dataset for catalog purposes.
+
+        Returns:
+            dict: A dictionary with dataset details.
+        """
+        return {
+            "type": "Properties store",
+            "path": self.path,
+            "partition_columns": PARTITION_COLUMNS,
+        }
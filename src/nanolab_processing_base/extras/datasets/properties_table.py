@@ -0,0 +1,60 @@
+from typing import Any, Dict, Optional, Union
+import logging
+
+import pandas as pd
+from kedro.io.core import AbstractDataset
+from kedro_datasets.pandas import CSVDataset
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Unchanged:
+    """Marker returned by a node whose table is already up to date (see UNCHANGED)."""
+
+
+UNCHANGED = Unchanged()
+
+
+class PropertiesTableDataSet(AbstractDataset):
+    def __init__(self, filepath: str, metadata: Optional[Dict[str, Any]] = None):
+        """
+        CSV file of a consolidated properties table, loaded and saved as a CSVDataset.
+
+        Saving UNCHANGED keeps the existing file as it is, so that a node with nothing
+        new to write does not have to read the table back only to save it again.
+
+        Args:
+            filepath (str): Path to the CSV file.
+            metadata (Dict[str, Any]): Any arbitrary metadata, ignored by Kedro
+                (e.g. kedro-viz settings).
+        """
+        super().__init__()
+        self.filepath = filepath
+        self.metadata = metadata
+        self._dataset = CSVDataset(filepath=filepath)
+
+    def _load(self) -> pd.DataFrame:
+        return self._dataset.load()
+
+    def _save(self, data: Union[pd.DataFrame, Unchanged]) -> None:
+        if isinstance(data, Unchanged):
+            logger.debug(f"Keeping {self.filepath} unchanged")
+            return
+        self._dataset.save(data)
+
+    def _exists(self) -> bool:
+        return self._dataset.exists()
+
+    def _describe(self) -> Dict[str, Any]:
+        """
+        Describe the dataset for catalog purposes.
+
+        Returns:
+            dict: A dictionary with dataset details.
+        """
+        return {
+            "type": "Properties table",
+            "filepath": self.filepath,
+        }
@@ -1,79 +1,88 @@
 from kedro.framework.hooks import hook_impl
 from kedro.io import DataCatalog
 from kedro_datasets.pandas import CSVDataset
-from kedro_datasets.partitions import PartitionedDataset
-from nanolab_processing_base.hooks_utils import separate_nanolab_dataset
+from nanolab_processing_base.extras.datasets.nanolab_dataframe import register_procedures
+from nanolab_processing_base.extras.datasets.manifest_file import ManifestDataSet
+from nanolab_processing_base.extras.datasets.optional_parquet import OptionalParquetDataSet
+from nanolab_processing_base.extras.datasets.properties_table import PropertiesTableDataSet
+from nanolab_processing_base.hooks_utils import primary_data_path, primary_dataset
 
 import logging
-from pathlib import Path
+from typing import Any, Dict
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns needed to fit CNPs, read through the data_{project}_sweeps datasets
+SWEEP_COLUMNS = ["Vg (V)", "VDS (V)"]
+
 
 class DynamicDatasetHook:
     def __init__(self):
         self.projects = None
-        self.is_processing = False  # Flag to prevent recursion
 
     @hook_impl
-    def after_catalog_created(self, catalog: DataCatalog, **kwargs) -> None:
+    def after_catalog_created(self, catalog: DataCatalog, conf_catalog: Dict[str, Any], **kwargs) -> None:
         """
-        Register dynamic datasets without triggering infinite recursion.
+        Register the primary datasets of every raw project.
+
+        Nothing is loaded here: the raw files are parsed by the base_processing
+        pipeline, so creating a catalog (kedro viz, jupyter, ...) stays cheap.
         """
         self.projects = [key for key in catalog.list() if key.startswith("project_")]
 
+        # Hand the resolved procedure schemas to NanoLabDataSet, so loading raw
+        # files never needs to create a KedroSession of its own
+        if "params:procedures" in catalog.list():
+            register_procedures(catalog.load("params:procedures"))
+
+        ingestion = catalog.load("params:ingestion") if "params:ingestion" in catalog.list() else {}
+        primary_format = ingestion.get("primary_format", "csv")
+
         for project in self.projects:
             # Define paths for the datasets
             properties_path = f"data/03_primary/properties_{project}.csv"
-            data_path = f"data/03_primary/data_{project}"
+            data_path = primary_data_path(project, primary_format)
+            manifest_path = f"data/03_primary/manifest_{project}.json"
+            stress_events_path = f"data/03_primary/stress_events_{project}.csv"
+            CNP_cache_path = f"data/02_intermediate/CNP_cache_{project}.parquet"
 
             # Register dynamic datasets
             catalog.add(
                 f"properties_{project}",
-                CSVDataset(filepath=properties_path),
+                PropertiesTableDataSet(filepath=properties_path),
             )
 
             catalog.add(
                 f"data_{project}",
-                PartitionedDataset(
-                    path=data_path,
-                    dataset=CSVDataset,
-                    filename_suffix=".csv",
-                ),
+                primary_dataset(data_path, primary_format),
             )
 
-        if self.is_processing:  # Prevent recursive calls
-            logger.info("Already processing datasets. Skipping this execution.")
-            return
-
-        self.is_processing = True  # Set flag to avoid recursion
-
-        try:
-            for project in self.projects:
-                # Define paths for the datasets
-                properties_path = Path(f"data/03_primary/properties_{project}.csv")
-                data_path = Path(f"data/03_primary/data_{project}")
-
-                # Skip if output already exists
-                if properties_path.exists() and data_path.exists():
-                    logger.info(f"Skipping {project}: output already exists")
-                    continue
-
-                logger.info(f"Processing dataset: {project}")
-                dataset = catalog.load(project)  # This might trigger catalog hooks
-                consolidated_props, indexed_data = separate_nanolab_dataset(dataset)
+            # Same experiments, reading only the columns used by the CNP fits
+            catalog.add(
+                f"data_{project}_sweeps",
+                primary_dataset(data_path, primary_format, columns=SWEEP_COLUMNS),
+            )
 
-                # Save properties
-                catalog.save(f"properties_{project}", consolidated_props)
-                logger.info(f"Saved properties for {project} to {properties_path}")
+            # Stress experiments and their neighbouring experiments, in Start time order
+            catalog.add(
+                f"stress_events_{project}",
+                CSVDataset(filepath=stress_events_path),
+            )
 
-                # Save partitioned dataset
-                catalog.save(f"data_{project}", indexed_data)
-                logger.info(f"Saved data partitions for {project} to {data_path}")
-        except Exception as e:
-            logger.error(f"Error processing datasets: {e}")
-        finally:
-            self.is_processing = False
+            # Raw file hashes written by the ingestion node, used to fingerprint the experiments
+            catalog.add(
+                f"manifest_{project}",
+                ManifestDataSet(filepath=manifest_path),
+            )
 
+            # CNPs fitted by the previous run, so that only new or changed experiments are refitted
+            catalog.add(
+                f"CNP_cache_{project}",
+                OptionalParquetDataSet(filepath=CNP_cache_path),
+            )
+            catalog.add(
+                f"CNP_cache_{project}_previous",
+                OptionalParquetDataSet(filepath=CNP_cache_path),
+            )
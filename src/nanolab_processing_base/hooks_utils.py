@@ -1,39 +1,232 @@
-from typing import Dict, Callable, Tuple
+import os
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Callable, Iterable, List, Optional, Tuple, Union
 import pandas as pd
 import logging
+from kedro_datasets.pandas import CSVDataset, FeatherDataset, ParquetDataset
+from kedro_datasets.partitions import PartitionedDataset
+from nanolab_processing_base.extras.datasets.experiment_store import ExperimentStoreDataSet
+from nanolab_processing_base.extras.datasets.nanolab_dataframe import convert_datetime_columns, register_procedures
+from nanolab_processing_base.parallel import DEFAULT_EXECUTOR, call, imap_ordered
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Storage formats with one file per experiment in data/03_primary:
+# dataset type, file suffix and the load argument that selects columns.
+# The "store" format keeps all experiments of a project in a single file instead.
+PRIMARY_FORMATS = {
+    "csv": (CSVDataset, ".csv", "usecols"),
+    "parquet": (ParquetDataset, ".parquet", "columns"),
+    "feather": (FeatherDataset, ".feather", "columns"),
+}
+
+
 def normalize_key(key: str) -> str:
     """Normalize path separators to forward slashes for cross-platform compatibility."""
     return key.replace("\\", "/")
 
 
-def separate_nanolab_dataset(experiments: Dict[str, Callable]) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+def primary_data_path(project: str, primary_format: str = "csv") -> str:
+    """
+    Returns where the per-experiment data of a project is stored in the primary layer:
+    a folder of partitions, or a single file for the consolidated "store" format.
+    """
+    if primary_format == "store":
+        return f"data/03_primary/data_{project}.parquet"
+    return f"data/03_primary/data_{project}"
+
+
+def primary_dataset(
+    path: str, primary_format: str = "csv", columns: Optional[List[str]] = None
+) -> Union[PartitionedDataset, ExperimentStoreDataSet]:
+    """
+    Creates the dataset holding the per-experiment data in the primary layer.
+
+    Both kinds of dataset load as a dictionary of loaders keyed by data_key.
+
+    Args:
+        path (str): Folder of the partitions, or file of the store (see ``primary_data_path``).
+        primary_format (str): "store" for a consolidated ``ExperimentStoreDataSet``, or one of
+            ``PRIMARY_FORMATS`` for one file per experiment. The columnar formats (Parquet,
+            Arrow IPC/Feather and the store) keep the dtypes of the procedure 'Data' schemas.
+        columns (List[str]): If given, only these columns are read from each experiment.
+    """
+    if primary_format == "store":
+        return ExperimentStoreDataSet(filepath=path, load_args={"columns": columns} if columns is not None else None)
+    if primary_format not in PRIMARY_FORMATS:
+        raise ValueError(
+            f"Unknown primary format '{primary_format}'. Expected 'store' or one of {list(PRIMARY_FORMATS)}."
+        )
+    dataset_type, filename_suffix, columns_arg = PRIMARY_FORMATS[primary_format]
+    dataset = {"type": dataset_type}
+    if columns is not None:
+        dataset["load_args"] = {columns_arg: columns}
+    return PartitionedDataset(path=path, dataset=dataset, filename_suffix=filename_suffix)
+
+
+def primary_data_exists(path: str, primary_format: str = "csv") -> bool:
+    """
+    Checks whether per-experiment data in the given format exists at ``path``.
+    """
+    if primary_format == "store":
+        return os.path.isfile(path) and os.path.isfile(f"{path}.index.json")
+    filename_suffix = PRIMARY_FORMATS[primary_format][1]
+    return os.path.isdir(path) and next(Path(path).rglob(f"*{filename_suffix}"), None) is not None
+
+
+def clear_primary_data(project: str) -> None:
+    """
+    Deletes the per-experiment data of a project in the primary layer, whatever its format.
+
+    Only the partition files of the ``PRIMARY_FORMATS`` and the files of the store are
+    removed, and each removal is logged: anything else kept in the data folder of the
+    project stays, and so does the folder (empty subfolders left behind are removed).
+    """
+    data_path = primary_data_path(project)
+    if os.path.isdir(data_path):
+        for primary_format, (_, filename_suffix, _) in PRIMARY_FORMATS.items():
+            partition_paths = list(Path(data_path).rglob(f"*{filename_suffix}"))
+            for partition_path in partition_paths:
+                partition_path.unlink()
+            if partition_paths:
+                logger.info(f"Removed {len(partition_paths)} {primary_format} partitions from {data_path}")
+        for folder, _, _ in sorted(os.walk(data_path), reverse=True):
+            if folder != data_path and not os.listdir(folder):
+                os.rmdir(folder)
+    store_path = primary_data_path(project, "store")
+    for path in (store_path, f"{store_path}.index.json"):
+        if os.path.exists(path):
+            os.remove(path)
+            logger.info(f"Removed {path}")
+
+
+def load_with_procedures(experiment_callable: Callable, procedures: Dict) -> Any:
+    """
+    Calls a partition loader once the procedures cache of the process holds
+    ``procedures``, so that a NanoLabDataSet parses with the schemas of the run even
+    in a worker process that did not inherit them (e.g. started with "spawn").
+    """
+    register_procedures(procedures)
+    return experiment_callable()
+
+
+def load_experiments(
+    experiments: Dict[str, Callable],
+    max_workers: Optional[int] = 1,
+    executor: str = DEFAULT_EXECUTOR,
+    max_in_flight: Optional[int] = None,
+    procedures: Optional[Dict] = None,
+) -> Tuple[Dict[str, Tuple[pd.Series, pd.DataFrame]], Dict[str, str]]:
+    """
+    Calls the load callable of every experiment, optionally in a thread or process pool.
+
+    Args:
+        experiments (Dict[str, Callable]): Partition loaders keyed by data_key.
+        max_workers (int): Pool size. With 1 the experiments are loaded serially.
+        executor (str): "thread" or "process".
+        max_in_flight (int): Bound on loads submitted but not yet collected.
+        procedures (Dict): Procedure schemas sent to the workers with every loader
+            (see ``load_with_procedures``). If None, the loaders use their own.
+
+    Returns:
+        Tuple[Dict, Dict]: The loaded (props, data) pairs and the error messages, both
+        keyed by normalized data_key and in the order of ``experiments``.
+    """
+    loaded = {}
+    errors = {}
+    items = ((normalize_key(key), experiment_callable) for key, experiment_callable in experiments.items())
+    function = call if procedures is None else partial(load_with_procedures, procedures=procedures)
+    for normalized_key, result, error in imap_ordered(function, items, max_workers, executor, max_in_flight):
+        if error is not None:
+            logger.error(f"Error processing experiment {normalized_key}: {error}")
+            errors[normalized_key] = str(error)
+            continue
+        loaded[normalized_key] = result
+        logger.debug(f"Processed experiment: {normalized_key}")
+    return loaded, errors
+
+
+def separate_nanolab_dataset(
+    experiments: Dict[str, Callable],
+    max_workers: Optional[int] = 1,
+    executor: str = DEFAULT_EXECUTOR,
+    max_in_flight: Optional[int] = None,
+    procedures: Optional[Dict] = None,
+) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
     """
     Separates a NanoLab dataset into a consolidated properties DataFrame and indexed data.
+
+    The experiments can be loaded in parallel (see ``load_experiments``); the output does
+    not depend on the pool settings. With lazy NanoLabDataSet partitions the data values
+    are loaders, which a ``PartitionedDataset`` calls when it saves them.
+
+    ``procedures`` are the schemas the experiments are parsed with, also sent to the
+    workers. The loaders give their 'datetime' keys as Unix seconds, converted here to
+    datetimes once for the whole project.
     """
     logger.info(f"Starting separation of NanoLab dataset with {len(experiments)} experiments.")
-    props_list = []
-    indexed_data = {}
-    for key, experiment_callable in experiments.items():
-        # Normalize the key to use forward slashes (cross-platform compatibility)
-        normalized_key = normalize_key(key)
-        try:
-            prop, data = experiment_callable()
-            props_list.append(prop)
-            indexed_data[normalized_key] = data
-            logger.info(f"Processed experiment: {normalized_key}")
-        except Exception as e:
-            logger.error(f"Error processing experiment {normalized_key}: {e}")
+    loaded, errors = load_experiments(experiments, max_workers, executor, max_in_flight, procedures)
+    props_list = [prop for prop, _ in loaded.values()]
+    indexed_data = {normalized_key: data for normalized_key, (_, data) in loaded.items()}
 
     consolidated_props = pd.DataFrame(props_list)
+    # The Unix seconds of all the experiments are converted in one pass
+    consolidated_props = convert_datetime_columns(consolidated_props, procedures)
 
     # we sort by date and reset the index
-    consolidated_props.sort_values(by="Start time", inplace=True)
+    if "Start time" in consolidated_props.columns:
+        consolidated_props.sort_values(by="Start time", inplace=True)
     consolidated_props.reset_index(drop=True, inplace=True)
 
+    if errors:
+        logger.warning(f"{len(errors)} of {len(experiments)} experiments could not be processed: {sorted(errors)}")
     logger.info("Finished dataset separation.")
     return consolidated_props, indexed_data
+
+
+def partition_filepath(dataset_config: Dict, key: str) -> str:
+    """
+    Returns the path of a partition of a ``PartitionedDataset`` from its catalog configuration.
+    """
+    return os.path.join(dataset_config["path"], key + dataset_config.get("filename_suffix", ""))
+
+
+def merge_props(
+    previous_props: Optional[pd.DataFrame],
+    new_props: pd.DataFrame,
+    replaced_keys: Iterable[str],
+) -> pd.DataFrame:
+    """
+    Updates a consolidated properties DataFrame with the rows of newly parsed experiments.
+
+    Rows of ``previous_props`` whose data_key is in ``replaced_keys`` (changed or removed
+    files) are dropped, the rows of ``new_props`` are appended and the result is sorted
+    by 'Start time' again.
+    """
+    if previous_props is None or previous_props.empty:
+        return new_props.reset_index(drop=True)
+
+    previous_props = previous_props.copy()
+    previous_props["data_key"] = previous_props["data_key"].apply(normalize_key)
+    previous_props = previous_props[~previous_props["data_key"].isin(set(replaced_keys))]
+    # 'Start time' comes back from the CSV as text
+    previous_props["Start time"] = pd.to_datetime(previous_props["Start time"], format="ISO8601")
+
+    merged = pd.concat([previous_props, new_props], ignore_index=True)
+    merged.sort_values(by="Start time", inplace=True)
+    merged.reset_index(drop=True, inplace=True)
+    return merged
+
+
+def remove_partitions(path: str, keys: Iterable[str], filename_suffix: str) -> None:
+    """
+    Deletes the files of the given partitions of a ``PartitionedDataset``, if they exist.
+    """
+    for key in keys:
+        partition_path = os.path.join(path, key + filename_suffix)
+        if os.path.exists(partition_path):
+            os.remove(partition_path)
+            logger.debug(f"Removed partition {partition_path}")
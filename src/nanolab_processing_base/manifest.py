@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bytes read at a time when hashing a file
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_hash(path: str) -> str:
+    """
+    Computes a fast content hash (BLAKE2b, 128 bits) of a file.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_hash(content: bytes) -> str:
+    """
+    Hash of content already in memory, equal to the ``file_hash`` of a file holding it.
+    """
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def file_fingerprint(path: str, previous: Optional[Dict] = None) -> Dict:
+    """
+    Describes a file by its path, size, modification time and content hash.
+
+    If ``previous`` (the entry recorded for the same file in an earlier manifest) has the
+    same size and modification time, its hash is reused and the file is not read.
+
+    Returns:
+        Dict: An entry with the keys 'path', 'size', 'mtime' and 'hash'.
+    """
+    stat = os.stat(path)
+    if previous is not None and previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime:
+        content_hash = previous["hash"]
+    else:
+        content_hash = file_hash(path)
+    return {"path": path, "size": stat.st_size, "mtime": stat.st_mtime, "hash": content_hash}
+
+
+def build_manifest(paths: Dict[str, str], previous: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+    """
+    Fingerprints every file in ``paths`` (data_key -> file path).
+    """
+    previous = previous or {}
+    return {key: file_fingerprint(path, previous.get(key)) for key, path in paths.items()}
+
+
+def diff_manifest(previous: Dict[str, Dict], current: Dict[str, Dict]) -> Tuple[List[str], List[str]]:
+    """
+    Compares two manifests.
+
+    Returns:
+        Tuple[List[str], List[str]]: The data_keys that were added or whose content
+        changed, in the order of ``current``, and the data_keys that were removed.
+    """
+    changed = [
+        key for key, entry in current.items()
+        if key not in previous or previous[key]["hash"] != entry["hash"]
+    ]
+    removed = [key for key in previous if key not in current]
+    return changed, removed
+
+
+def load_manifest(path: str) -> Dict[str, Dict]:
+    """
+    Reads a manifest written by ``save_manifest``. A missing file gives an empty manifest.
+    """
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        logger.warning(f"Ignoring unreadable manifest {path}")
+        return {}
+
+
+def save_manifest(manifest: Dict[str, Dict], path: str) -> None:
+    """
+    Writes a manifest as JSON. The file is replaced atomically, so an interrupted run
+    never leaves a truncated manifest behind.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(temporary_path, path)
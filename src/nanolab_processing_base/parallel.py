@@ -0,0 +1,88 @@
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXECUTORS: Dict[str, type] = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+# Executor used when the parameters do not set one. The pooled work (parsing, fitting,
+# rendering) is CPU bound, so processes scale where threads would contend for the GIL
+DEFAULT_EXECUTOR = "process"
+
+
+def call(function: Callable[[], Any]) -> Any:
+    """Calls a zero-argument callable, e.g. a partition loader. Picklable for process pools."""
+    return function()
+
+
+def make_executor(executor: str, max_workers: int) -> Executor:
+    """
+    Creates a thread or process pool.
+
+    Args:
+        executor (str): Either "thread" or "process".
+        max_workers (int): Number of workers of the pool.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{executor}'. Expected one of {list(EXECUTORS)}.")
+    return EXECUTORS[executor](max_workers=max_workers)
+
+
+def imap_ordered(
+    function: Callable[[Any], Any],
+    items: Iterable[Tuple[str, Any]],
+    max_workers: Optional[int] = 1,
+    executor: str = DEFAULT_EXECUTOR,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[Tuple[str, Any, Optional[BaseException]]]:
+    """
+    Applies ``function`` to the value of each ``(key, value)`` item, optionally in a pool.
+
+    Results are yielded in input order, whatever the completion order, and at most
+    ``max_in_flight`` items are submitted but not yet yielded at any time. Exceptions
+    raised by ``function`` are not propagated: they are yielded with their key, so the
+    caller can collect them per item.
+
+    Args:
+        function (Callable): Function applied to each value. Must be picklable for
+            the "process" executor.
+        items (Iterable[Tuple[str, Any]]): Pairs of (key, value).
+        max_workers (int): Pool size. With 1 (or less) everything runs in the calling thread.
+        executor (str): "thread" or "process".
+        max_in_flight (int): Bound on submitted work. Defaults to twice ``max_workers``.
+
+    Yields:
+        Tuple[str, Any, Optional[BaseException]]: The key, the result (None on error)
+        and the exception raised (None on success).
+    """
+    if not max_workers or max_workers <= 1:
+        for key, value in items:
+            try:
+                yield key, function(value), None
+            except Exception as e:
+                yield key, None, e
+        return
+
+    max_in_flight = max_in_flight or 2 * max_workers
+    pending: Deque[Tuple[str, Future]] = deque()
+    with make_executor(executor, max_workers) as pool:
+        for key, value in items:
+            pending.append((key, pool.submit(function, value)))
+            if len(pending) >= max_in_flight:
+                yield _result(*pending.popleft())
+        while pending:
+            yield _result(*pending.popleft())
+
+
+def _result(key: str, future: Future) -> Tuple[str, Any, Optional[BaseException]]:
+    try:
+        return key, future.result(), None
+    except Exception as e:
+        return key, None, e
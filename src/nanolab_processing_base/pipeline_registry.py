@@ -1,15 +1,43 @@
 """Project pipelines."""
 
+import importlib
+import traceback
+import warnings
+
 from kedro.framework.project import find_pipelines
 from kedro.pipeline import Pipeline
 
+# Pipelines made by other factories of the modular pipelines, not part of the default
+# pipeline: registered name -> (modular pipeline, factory function)
+EXTRA_PIPELINES = {
+    # Alternative to CNP_calculations, with the same outputs from a single node that
+    # fits the CNPs of all the projects as one job
+    "CNP_calculations_batched": ("CNP_calculations", "create_batched_pipeline"),
+    # Histogram of each sample in its own PDF, besides the multi-page bundle of
+    # CNP_after_annealing_histograms
+    "CNP_after_annealing_histograms_per_sample": ("CNP_after_annealing_histograms", "create_per_sample_pipeline"),
+}
+
 
 def register_pipelines() -> dict[str, Pipeline]:
     """Register the project's pipelines.
 
+    Like the pipelines found by ``find_pipelines``, an extra pipeline whose module cannot
+    be imported (e.g. a missing optional dependency) is skipped with a warning, and the
+    other pipelines are still registered.
+
     Returns:
         A mapping from pipeline names to ``Pipeline`` objects.
     """
     pipelines = find_pipelines()
     pipelines["__default__"] = sum(pipelines.values())
+    for name, (pipeline_name, factory) in EXTRA_PIPELINES.items():
+        module_name = f"nanolab_processing_base.pipelines.{pipeline_name}"
+        try:
+            pipelines[name] = getattr(importlib.import_module(module_name), factory)()
+        except Exception:
+            warnings.warn(
+                f"An error occurred while creating the '{name}' pipeline with "
+                f"{module_name}.{factory}, so it is not registered:\n{traceback.format_exc()}"
+            )
     return pipelines
@@ -3,8 +3,8 @@ This is a boilerplate pipeline 'CNP_after_annealing_histograms'
 generated using Kedro 0.19.11
 """
 
-from .pipeline import create_pipeline
+from .pipeline import create_per_sample_pipeline, create_pipeline
 
-__all__ = ["create_pipeline"]
+__all__ = ["create_per_sample_pipeline", "create_pipeline"]
 
 __version__ = "0.1"
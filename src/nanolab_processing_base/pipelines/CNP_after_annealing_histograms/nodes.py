@@ -11,10 +11,12 @@ import nanoplot as nplt
 import numpy as np
 import pandas as pd
 
+from nanolab_processing_base.stress_events import previous_positions
+
 nplt.apply()
 
 
-def get_after_annealing_cnps(props: pd.DataFrame) -> pd.DataFrame:
+def get_after_annealing_cnps(props: pd.DataFrame, stress_events: pd.DataFrame) -> pd.DataFrame:
     """
     Extract CNP values from VVg experiments that occur just before stress.
     These are the experiments "after annealing" - the baseline measurements
@@ -22,6 +24,7 @@ def get_after_annealing_cnps(props: pd.DataFrame) -> pd.DataFrame:
 
     Args:
         props: DataFrame with CNP calculations (properties_project_CHIPXY_with_CNPs).
+        stress_events: Stress-event index of the same project (stress_events_project_CHIPXY).
 
     Returns:
         DataFrame containing only the VVg rows immediately before stress experiments.
@@ -29,20 +32,15 @@ def get_after_annealing_cnps(props: pd.DataFrame) -> pd.DataFrame:
     props = props.sort_values(by="Start time").reset_index(drop=True).copy()
     props["VG"] = props["VG"].ffill()
 
-    # Find indices where "Procedure type" is "Stress"
-    stress_idx = props.index[props["Procedure type"] == "Stress"]
-
-    # Get the row index just before each "Stress" (these are VVg after annealing)
-    previous_idx = [i - 1 for i in stress_idx if (i - 1) in props.index]
-
-    # Select only those rows
-    after_annealing = props.loc[previous_idx].copy()
+    # Select only the rows just before each "Stress" (these are VVg after annealing)
+    after_annealing = props.iloc[previous_positions(props, stress_events)].copy()
 
     return after_annealing
 
 
 def create_cnp_histogram(
     props: pd.DataFrame,
+    stress_events: pd.DataFrame,
     sample_name: str,
 ) -> plt.Figure:
     """
@@ -50,13 +48,14 @@ def create_cnp_histogram(
 
     Args:
         props: DataFrame with CNP calculations (properties_project_CHIPXY_with_CNPs).
+        stress_events: Stress-event index of the same project (stress_events_project_CHIPXY).
         sample_name: Name of the sample (e.g., "CHIP1A") for the plot title.
 
     Returns:
         matplotlib Figure object with the histogram.
     """
     # Get only the after-annealing experiments
-    after_annealing = get_after_annealing_cnps(props)
+    after_annealing = get_after_annealing_cnps(props, stress_events)
 
     # Get CNP forward values
     cnp_values = after_annealing["CNP_gate_voltage_forward"].dropna()
@@ -80,7 +79,7 @@ def create_cnp_histogram(
 
 
 def create_cnp_deviation_summary(
-    *all_props: pd.DataFrame,
+    *all_inputs: pd.DataFrame,
     sample_names: list[str],
 ) -> plt.Figure:
     """
@@ -89,8 +88,9 @@ def create_cnp_deviation_summary(
     Background is shaded by chip color.
 
     Args:
-        *all_props: All DataFrames with CNP calculations for each sample.
-        sample_names: List of sample names in the same order as all_props.
+        *all_inputs: All DataFrames with CNP calculations for each sample, followed by
+            the stress-event index of each sample.
+        sample_names: List of sample names in the same order as the inputs.
 
     Returns:
         matplotlib Figure object with the summary plot.
@@ -108,8 +108,9 @@ def create_cnp_deviation_summary(
     valid_sample_names = []
     chips = []
 
-    for props, sample_name in zip(all_props, sample_names):
-        after_annealing = get_after_annealing_cnps(props)
+    all_props, all_stress_events = all_inputs[:len(sample_names)], all_inputs[len(sample_names):]
+    for props, stress_events, sample_name in zip(all_props, all_stress_events, sample_names):
+        after_annealing = get_after_annealing_cnps(props, stress_events)
         cnp_values = after_annealing["CNP_gate_voltage_forward"].dropna()
 
         if len(cnp_values) > 0:
@@ -176,7 +177,7 @@ def create_cnp_deviation_summary(
 
 
 def create_cnp_deviation_histograms(
-    *all_props: pd.DataFrame,
+    *all_inputs: pd.DataFrame,
     sample_names: list[str],
 ) -> plt.Figure:
     """
@@ -184,8 +185,9 @@ def create_cnp_deviation_histograms(
     from mean CNP values across all samples.
 
     Args:
-        *all_props: All DataFrames with CNP calculations for each sample.
-        sample_names: List of sample names in the same order as all_props.
+        *all_inputs: All DataFrames with CNP calculations for each sample, followed by
+            the stress-event index of each sample.
+        sample_names: List of sample names in the same order as the inputs.
 
     Returns:
         matplotlib Figure object with three overlapping histograms.
@@ -194,8 +196,9 @@ def create_cnp_deviation_histograms(
     max_devs = []
     std_devs = []
 
-    for props, sample_name in zip(all_props, sample_names):
-        after_annealing = get_after_annealing_cnps(props)
+    all_props, all_stress_events = all_inputs[:len(sample_names)], all_inputs[len(sample_names):]
+    for props, stress_events, sample_name in zip(all_props, all_stress_events, sample_names):
+        after_annealing = get_after_annealing_cnps(props, stress_events)
         cnp_values = after_annealing["CNP_gate_voltage_forward"].dropna()
 
         if len(cnp_values) > 0:
@@ -5,58 +5,87 @@ generated using Kedro 0.19.11
 
 from functools import partial
 
-from kedro.pipeline import Pipeline, node, pipeline
+from kedro.pipeline import Pipeline, pipeline
+
+from nanolab_processing_base.reporting import ReportFigure, ReportPage, report_bundle, report_node
 
 from .nodes import create_cnp_histogram, create_cnp_deviation_summary, create_cnp_deviation_histograms
 
+# Define all samples for each chip (excluding removed samples: 3E, 4F)
+SAMPLES = {
+    "CHIP1": ["A", "B", "C", "D", "E", "F", "G", "H", "I"],
+    "CHIP3": ["A", "B", "C", "D", "F", "G", "H", "I", "J"],  # E removed
+    "CHIP4": ["A", "B", "C", "D", "E", "G", "H", "I", "J"],  # F removed
+}
+
+
+def sample_names() -> list[str]:
+    """Names of all the samples (e.g. "CHIP1A"), chip by chip."""
+    return [f"{chip}{letter}" for chip, letters in SAMPLES.items() for letter in letters]
+
+
+def histogram_inputs(sample_name: str) -> list[str]:
+    """Inputs of the histogram of a sample: its props with CNPs and its stress events."""
+    return [f"properties_project_{sample_name}_with_CNPs", f"stress_events_project_{sample_name}"]
+
 
 def create_pipeline(**kwargs) -> Pipeline:
-    # Define all samples for each chip (excluding removed samples: 3E, 4F)
-    samples = {
-        "CHIP1": ["A", "B", "C", "D", "E", "F", "G", "H", "I"],
-        "CHIP3": ["A", "B", "C", "D", "F", "G", "H", "I", "J"],  # E removed
-        "CHIP4": ["A", "B", "C", "D", "E", "G", "H", "I", "J"],  # F removed
-    }
-
-    nodes = []
-
-    # Build list of all sample names and inputs for summary plot
-    all_sample_names = []
-    all_inputs = []
-
-    for chip, letters in samples.items():
-        for letter in letters:
-            sample_name = f"{chip}{letter}"
-            all_sample_names.append(sample_name)
-            all_inputs.append(f"properties_project_{sample_name}_with_CNPs")
-
-            nodes.append(
-                node(
-                    func=partial(create_cnp_histogram, sample_name=sample_name),
-                    inputs=f"properties_project_{sample_name}_with_CNPs",
-                    outputs=f"cnp_after_annealing_histogram_{sample_name}",
-                    name=f"create_cnp_histogram_{sample_name}",
+    all_sample_names = sample_names()
+
+    # Build list of all inputs for summary plot
+    all_inputs = [f"properties_project_{sample_name}_with_CNPs" for sample_name in all_sample_names]
+    all_stress_events = [f"stress_events_project_{sample_name}" for sample_name in all_sample_names]
+
+    # Histograms of all the samples, as the pages of a single PDF
+    figures = [
+        report_bundle(
+            [
+                ReportPage(
+                    function=partial(create_cnp_histogram, sample_name=sample_name),
+                    inputs=histogram_inputs(sample_name),
+                    title=sample_name,
                 )
-            )
-
-    # Add summary plot node
-    nodes.append(
-        node(
-            func=partial(create_cnp_deviation_summary, sample_names=all_sample_names),
-            inputs=all_inputs,
-            outputs="cnp_after_annealing_deviation_summary",
-            name="create_cnp_deviation_summary",
+                for sample_name in all_sample_names
+            ],
+            output="cnp_after_annealing_histograms",
+        )
+    ]
+
+    # Add summary plot
+    figures.append(
+        ReportFigure(
+            function=partial(create_cnp_deviation_summary, sample_names=all_sample_names),
+            inputs=all_inputs + all_stress_events,
+            output="cnp_after_annealing_deviation_summary",
         )
     )
 
-    # Add deviation histograms node
-    nodes.append(
-        node(
-            func=partial(create_cnp_deviation_histograms, sample_names=all_sample_names),
-            inputs=all_inputs,
-            outputs="cnp_after_annealing_deviation_histograms",
-            name="create_cnp_deviation_histograms",
+    # Add deviation histograms
+    figures.append(
+        ReportFigure(
+            function=partial(create_cnp_deviation_histograms, sample_names=all_sample_names),
+            inputs=all_inputs + all_stress_events,
+            output="cnp_after_annealing_deviation_histograms",
         )
     )
 
-    return pipeline(nodes)
+    # All the figures are rendered by one node, in parallel when enabled
+    return pipeline([report_node(figures, name="create_cnp_after_annealing_histograms")])
+
+
+def create_per_sample_pipeline(**kwargs) -> Pipeline:
+    """
+    Histogram of each sample in its own file (one per sample, in
+    data/08_reporting/cnp_after_annealing_histograms/), instead of the pages of the
+    bundle of the default pipeline.
+    """
+    figures = [
+        ReportFigure(
+            function=partial(create_cnp_histogram, sample_name=sample_name),
+            inputs=histogram_inputs(sample_name),
+            output=f"cnp_after_annealing_histogram_{sample_name}",
+        )
+        for sample_name in sample_names()
+    ]
+
+    return pipeline([report_node(figures, name="create_cnp_histograms_per_sample")])
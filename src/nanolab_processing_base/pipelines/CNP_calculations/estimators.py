@@ -0,0 +1,433 @@
+"""
+CNP estimators of the 'CNP_calculations' pipeline.
+
+Every estimator works on a batch of sweeps at once: it takes a list of (Vg (V), VDS (V))
+arrays and returns the CNP gate and drain voltages of all of them. Estimators are
+registered by type in ESTIMATORS and selected, with their options, through the
+'estimators' entry of the 'CNP_calculations' parameters.
+"""
+
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Number of highest VDS (V) points the CNP parabola is fitted to
+CNP_FIT_POINTS = 8
+
+# Maximum number of precomputed fit matrices kept by GridSolvers
+GRID_SOLVERS_MAX_SIZE = 4096
+
+# Sweeps are on the same Vg (V) grid when their gate voltages agree once rounded to
+# this many decimals (1 uV, far below the resolution of the measurements), so that
+# setpoints recorded with float noise still share a grid
+GRID_DECIMALS = 6
+
+# Grids with fewer sweeps than this are not worth their fit matrices: their sweeps
+# are fitted together by fit_CNPs instead
+MIN_GRID_GROUP_SIZE = 16
+
+# Number of evenly spaced points of each sweep compared to find candidate groups
+GRID_KEY_POINTS = 8
+
+# The Vg (V) and VDS (V) arrays of a sweep
+Sweep = Tuple[np.ndarray, np.ndarray]
+# The CNP gate voltages and CNP drain voltages of a batch of sweeps
+Estimates = Tuple[np.ndarray, np.ndarray]
+Estimator = Callable[[List[Sweep]], Estimates]
+
+# Estimators used when the parameters do not list any: the parabola of get_CNP
+DEFAULT_ESTIMATORS: Dict[str, Dict[str, Any]] = {"parabola": {"type": "parabola"}}
+
+
+def pad_sweeps(sweeps: List[Sweep]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stacks the (Vg (V), VDS (V)) arrays of sweeps of different lengths into two
+    (n_sweeps, max_length) arrays, padded with NaN.
+    """
+    length = max((len(vg) for vg, _ in sweeps), default=0)
+    padded_vg = np.full((len(sweeps), length), np.nan)
+    padded_vds = np.full((len(sweeps), length), np.nan)
+    for i, (vg, vds) in enumerate(sweeps):
+        padded_vg[i, :len(vg)] = vg
+        padded_vds[i, :len(vds)] = vds
+    return padded_vg, padded_vds
+
+
+def rounded_grids(vg: np.ndarray) -> np.ndarray:
+    """
+    Vg (V) values rounded to GRID_DECIMALS (with -0.0 as 0.0), NaN padding as inf so
+    that padded points compare equal.
+    """
+    return np.ascontiguousarray(np.where(np.isnan(vg), np.inf, np.round(vg, GRID_DECIMALS) + 0.0))
+
+
+def grid_key(grid: np.ndarray) -> bytes:
+    """
+    Key of a Vg (V) grid: its values rounded to GRID_DECIMALS (with -0.0 as 0.0).
+    """
+    return (np.round(grid, GRID_DECIMALS) + 0.0).tobytes()
+
+
+def top_point_columns(vds: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k highest VDS (V) values of every sweep (row), in increasing order.
+
+    The points are selected with argpartition. NaN (e.g. padding) is never selected
+    before real points, and ties go to the earliest points, like a stable sort by
+    descending VDS (V) followed by head(k).
+    """
+    n_sweeps, length = vds.shape
+    # Threshold of each sweep: its k-th highest VDS (V) value
+    scores = np.where(np.isnan(vds), -np.inf, vds)
+    threshold = np.take_along_axis(
+        scores, np.argpartition(scores, length - k, axis=1)[:, length - k:length - k + 1], axis=1
+    )
+    # Points above the threshold, then the earliest points equal to it, exactly k points per sweep
+    above = scores > threshold
+    at_threshold = scores == threshold
+    missing = k - above.sum(axis=1, keepdims=True)
+    top = above | (at_threshold & (np.cumsum(at_threshold, axis=1) <= missing))
+    return np.nonzero(top)[1].reshape(n_sweeps, k)
+
+
+def fit_CNPs(vg: np.ndarray, vds: np.ndarray, n_points: int = CNP_FIT_POINTS) -> Estimates:
+    """
+    Batched version of get_CNP: fits a parabola to the n_points highest VDS (V) values
+    of every sweep (row) at once and returns the CNP gate and drain voltages.
+
+    The points are selected with top_point_columns and fitted with fit_parabolas.
+    Sweeps with fewer than 3 valid points, or with a degenerate fit, give NaN.
+
+    Args:
+        vg: Gate voltages, shape (n_sweeps, length), NaN padded (see pad_sweeps).
+        vds: Drain voltages, same shape.
+        n_points: Number of highest VDS (V) points used in each fit.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: CNP gate voltage and CNP drain voltage of each sweep.
+    """
+    n_sweeps, length = vds.shape
+    k = min(n_points, length)
+    if k == 0:
+        return np.full(n_sweeps, np.nan), np.full(n_sweeps, np.nan)
+
+    columns = top_point_columns(vds, k)
+    x = np.take_along_axis(vg, columns, axis=1)
+    y = np.take_along_axis(vds, columns, axis=1)
+    return fit_parabolas(x, y)
+
+
+def fit_parabolas(x: np.ndarray, y: np.ndarray, weights: Optional[np.ndarray] = None) -> Estimates:
+    """
+    Fits a parabola y = f(x) to the points of every row at once, by (weighted) least
+    squares, and returns the vertices. NaN points are left out.
+
+    The fits are solved in closed form from the normal equations, with x centered on
+    the (weighted) mean of each row for accuracy. Rows with fewer than 3 valid points,
+    or with a degenerate fit, give NaN.
+
+    Args:
+        x: Gate voltages of the points, shape (n_sweeps, k).
+        y: Drain voltages of the points, same shape.
+        weights: Weights of the points, same shape. None weighs all points equally.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: x and y of the vertex of each row.
+    """
+    valid = ~(np.isnan(x) | np.isnan(y))
+    w = valid.astype(float) if weights is None else np.where(valid, weights, 0.0)
+    y = np.where(valid, y, 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n = valid.sum(axis=1)
+        s0 = w.sum(axis=1)
+        mean = np.where(valid, w * x, 0.0).sum(axis=1) / s0
+        u = np.where(valid, x - mean[:, None], 0.0)
+        u2 = u * u
+
+        # Normal equations of y = c0 + c1 u + c2 u^2 (weighted sum of u is 0 once centered):
+        # [[S0, 0, S2], [0, S2, S3], [S2, S3, S4]] @ [c0, c1, c2] = [T0, T1, T2]
+        s2, s3, s4 = (w * u2).sum(axis=1), (w * u2 * u).sum(axis=1), (w * u2 * u2).sum(axis=1)
+        t0, t1, t2 = (w * y).sum(axis=1), (w * u * y).sum(axis=1), (w * u2 * y).sum(axis=1)
+
+        # Cramer's rule
+        det = s0 * (s2 * s4 - s3 * s3) - s2 ** 3
+        c0 = (t0 * (s2 * s4 - s3 * s3) + s2 * (t1 * s3 - s2 * t2)) / det
+        c1 = (s0 * (t1 * s4 - s3 * t2) + t0 * s2 * s3 - s2 * s2 * t1) / det
+        c2 = (s0 * (s2 * t2 - s3 * t1) - t0 * s2 * s2) / det
+
+        vertex = -c1 / (2 * c2)
+        vertex_x = mean + vertex
+        vertex_y = c0 + (c1 + c2 * vertex) * vertex
+
+    degenerate = (n < 3) | (det == 0)
+    vertex_x[degenerate] = np.nan
+    vertex_y[degenerate] = np.nan
+    return vertex_x, vertex_y
+
+
+class GridSolvers:
+    def __init__(self, max_size: int = GRID_SOLVERS_MAX_SIZE):
+        """
+        Bounded memo of the least-squares fit matrices of the CNP parabolas.
+
+        Sweeps measured on the same Vg (V) grid whose highest VDS (V) values are at the
+        same positions are fitted on the same points, so the fit is a fixed linear map
+        of their VDS (V) values: the pseudo-inverse of the Vandermonde matrix
+        [1, u, u^2] of the points, with u = Vg (V) centered on their mean. It is
+        computed once per (grid, positions) and reused, least recently used first out.
+        Grids are identified by grid_key, so grids equal up to GRID_DECIMALS share
+        their matrices.
+
+        Args:
+            max_size (int): Maximum number of matrices kept.
+        """
+        self.max_size = max_size
+        self._solvers: "OrderedDict[Tuple[bytes, bytes], Optional[Tuple[float, np.ndarray]]]" = OrderedDict()
+
+    def get(self, grid_key: bytes, grid: np.ndarray, columns: np.ndarray) -> Optional[Tuple[float, np.ndarray]]:
+        """
+        Fit matrix of the points of ``grid`` at ``columns``.
+
+        Args:
+            grid_key (bytes): Key of the grid (see grid_key).
+            grid (np.ndarray): Gate voltages of the grid.
+            columns (np.ndarray): Positions of the fitted points in the grid.
+
+        Returns:
+            Optional[Tuple[float, np.ndarray]]: The mean of the Vg (V) of the points and
+            the (3, k) matrix giving [c0, c1, c2] from their VDS (V), or None when the
+            fit is degenerate (NaN or fewer than 3 distinct Vg (V)).
+        """
+        key = (grid_key, columns.tobytes())
+        if key in self._solvers:
+            self._solvers.move_to_end(key)
+            return self._solvers[key]
+
+        x = grid[columns]
+        solver = None
+        if np.isfinite(x).all() and len(np.unique(x)) >= 3:
+            mean = x.mean()
+            u = x - mean
+            solver = (mean, np.linalg.pinv(np.column_stack([np.ones_like(u), u, u * u])))
+        self._solvers[key] = solver
+        if len(self._solvers) > self.max_size:
+            self._solvers.popitem(last=False)
+        return solver
+
+
+_grid_solvers = GridSolvers()
+
+
+def fit_CNPs_on_grid(
+    grid: np.ndarray, vds: np.ndarray, n_points: int = CNP_FIT_POINTS, solvers: Optional[GridSolvers] = None
+) -> Estimates:
+    """
+    Same as fit_CNPs, for sweeps measured on the same Vg (V) grid.
+
+    The fits reuse the matrices of GridSolvers instead of building and solving the
+    normal equations of every sweep. Sweeps whose fit has no matrix (NaN among the
+    selected points, degenerate fit) go through fit_CNPs.
+
+    Args:
+        grid: Gate voltages shared by the sweeps, shape (length,).
+        vds: Drain voltages, shape (n_sweeps, length).
+        n_points: Number of highest VDS (V) points used in each fit.
+        solvers: Memo of the fit matrices, shared by the process by default.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: CNP gate voltage and CNP drain voltage of each sweep.
+    """
+    solvers = _grid_solvers if solvers is None else solvers
+    n_sweeps, length = vds.shape
+    k = min(n_points, length)
+    if k < 3:
+        return np.full(n_sweeps, np.nan), np.full(n_sweeps, np.nan)
+
+    columns = top_point_columns(vds, k)
+    position_sets, inverse = np.unique(columns, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    key = grid_key(grid)
+    means = np.full(len(position_sets), np.nan)
+    matrices = np.zeros((len(position_sets), 3, k))
+    for i, positions in enumerate(position_sets):
+        solver = solvers.get(key, grid, positions)
+        if solver is not None:
+            means[i], matrices[i] = solver
+
+    y = np.take_along_axis(vds, columns, axis=1)
+    c0, c1, c2 = np.einsum("sjk,sk->js", matrices[inverse], y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vertex = -c1 / (2 * c2)
+        CNP_gate_voltage = means[inverse] + vertex
+        CNP_drain_voltage = c0 + (c1 + c2 * vertex) * vertex
+
+    fallback = np.isnan(means[inverse]) | np.isnan(y).any(axis=1)
+    if fallback.any():
+        rows = vds[fallback]
+        CNP_gate_voltage[fallback], CNP_drain_voltage[fallback] = fit_CNPs(
+            np.broadcast_to(grid, rows.shape), rows, n_points=n_points
+        )
+    return CNP_gate_voltage, CNP_drain_voltage
+
+
+def fit_sweeps(
+    sweeps: List[Sweep], n_points: int = CNP_FIT_POINTS, min_group_size: int = MIN_GRID_GROUP_SIZE
+) -> Estimates:
+    """
+    Fits the CNP of many (Vg (V), VDS (V)) sweeps.
+
+    Sweeps are grouped by Vg (V) grid, rounded to GRID_DECIMALS: candidate groups come
+    from GRID_KEY_POINTS points of each padded sweep, and are then checked on all their
+    points. Grids shared by at least ``min_group_size`` sweeps are fitted with
+    fit_CNPs_on_grid; all the other sweeps (e.g. grids that never repeat because of
+    measurement noise) are fitted together by fit_CNPs, so that they cost no more than
+    the padded fit.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: CNP gate voltage and CNP drain voltage of each sweep.
+    """
+    vg, vds = pad_sweeps(sweeps)
+    n_sweeps, length = vg.shape
+    CNP_gate_voltage = np.full(n_sweeps, np.nan)
+    CNP_drain_voltage = np.full(n_sweeps, np.nan)
+    if n_sweeps == 0:
+        return CNP_gate_voltage, CNP_drain_voltage
+
+    others = np.ones(n_sweeps, dtype=bool)
+    if n_sweeps >= min_group_size:
+        # Candidate groups from a few rounded points of each sweep (padding included, so
+        # lengths differ too): sweeps alone in their candidate group are not compared
+        # further, which keeps grids that never repeat as cheap as the padded fit
+        columns = np.unique(np.linspace(0, length - 1, GRID_KEY_POINTS).astype(int))
+        samples = rounded_grids(vg[:, columns])
+        samples = samples.view(np.dtype((np.void, samples.itemsize * len(columns)))).reshape(-1)
+        _, first, inverse, sizes = np.unique(samples, return_index=True, return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+
+        for group in np.flatnonzero(sizes >= min_group_size):
+            rows = np.flatnonzero(inverse == group)
+            grids = rounded_grids(vg[rows])
+            rows = rows[(grids == grids[np.searchsorted(rows, first[group])]).all(axis=1)]
+            if len(rows) < min_group_size:
+                continue
+            grid_length = len(sweeps[first[group]][0])
+            CNP_gate_voltage[rows], CNP_drain_voltage[rows] = fit_CNPs_on_grid(
+                vg[first[group], :grid_length], vds[rows, :grid_length], n_points=n_points
+            )
+            others[rows] = False
+
+    if others.all():
+        return fit_CNPs(vg, vds, n_points=n_points)
+    if others.any():
+        CNP_gate_voltage[others], CNP_drain_voltage[others] = fit_CNPs(vg[others], vds[others], n_points=n_points)
+    return CNP_gate_voltage, CNP_drain_voltage
+
+
+ESTIMATORS: Dict[str, Callable[..., Estimates]] = {}
+
+
+def register_estimator(name: str) -> Callable[[Callable[..., Estimates]], Callable[..., Estimates]]:
+    """
+    Decorator registering a batched estimator under the type ``name``. The estimator
+    takes the list of sweeps and its options as keyword arguments.
+    """
+    def register(estimator: Callable[..., Estimates]) -> Callable[..., Estimates]:
+        ESTIMATORS[name] = estimator
+        return estimator
+    return register
+
+
+@register_estimator("parabola")
+def parabola(sweeps: List[Sweep], n_points: int = CNP_FIT_POINTS) -> Estimates:
+    """
+    Vertex of the parabola fitted to the n_points highest VDS (V) values (get_CNP).
+    A wider window is the same estimator with more points.
+    """
+    return fit_sweeps(sweeps, n_points=n_points)
+
+
+@register_estimator("weighted_parabola")
+def weighted_parabola(sweeps: List[Sweep], n_points: int = CNP_FIT_POINTS, width: float = 1.0) -> Estimates:
+    """
+    Vertex of the parabola fitted to the n_points highest VDS (V) values, weighted by a
+    Gaussian of the distance (in Vg (V)) to the highest point, of standard deviation
+    ``width`` (V), so that the points far from the peak count less.
+    """
+    vg, vds = pad_sweeps(sweeps)
+    n_sweeps, length = vds.shape
+    k = min(n_points, length)
+    if k == 0:
+        return np.full(n_sweeps, np.nan), np.full(n_sweeps, np.nan)
+
+    columns = top_point_columns(vds, k)
+    x = np.take_along_axis(vg, columns, axis=1)
+    y = np.take_along_axis(vds, columns, axis=1)
+    peak = np.argmax(np.where(np.isnan(y), -np.inf, y), axis=1)
+    distance = x - x[np.arange(n_sweeps), peak][:, None]
+    return fit_parabolas(x, y, weights=np.exp(-0.5 * (distance / width) ** 2))
+
+
+@register_estimator("smoothed_argmax")
+def smoothed_argmax(sweeps: List[Sweep], window: int = 5) -> Estimates:
+    """
+    Vg (V) and value of the maximum of VDS (V) smoothed by a centered moving average
+    of ``window`` points (fewer at the ends of the sweep). NaN points are left out of
+    the averages.
+    """
+    vg, vds = pad_sweeps(sweeps)
+    n_sweeps, length = vds.shape
+    if length == 0:
+        return np.full(n_sweeps, np.nan), np.full(n_sweeps, np.nan)
+
+    valid = ~np.isnan(vds)
+    # Moving sums from cumulative sums, over the [start, stop) window of each point
+    sums = np.pad(np.cumsum(np.where(valid, vds, 0.0), axis=1), ((0, 0), (1, 0)))
+    counts = np.pad(np.cumsum(valid, axis=1), ((0, 0), (1, 0)))
+    positions = np.arange(length)
+    start = np.clip(positions - (window - 1) // 2, 0, length)
+    stop = np.clip(positions + window // 2 + 1, 0, length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        smoothed = (sums[:, stop] - sums[:, start]) / (counts[:, stop] - counts[:, start])
+    smoothed[~valid] = np.nan
+
+    has_points = valid.any(axis=1)
+    peak = np.argmax(np.where(valid, smoothed, -np.inf), axis=1)
+    rows = np.arange(n_sweeps)
+    CNP_gate_voltage = np.where(has_points, vg[rows, peak], np.nan)
+    CNP_drain_voltage = np.where(has_points, smoothed[rows, peak], np.nan)
+    return CNP_gate_voltage, CNP_drain_voltage
+
+
+def make_estimators(config: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Estimator]:
+    """
+    Builds the estimators listed in the parameters.
+
+    Args:
+        config: Options of each estimator, keyed by estimator name: its 'type' (a key
+            of ESTIMATORS) and its keyword arguments. Defaults to DEFAULT_ESTIMATORS.
+
+    Returns:
+        Dict[str, Estimator]: The estimators, by name, in the order of ``config``.
+    """
+    estimators = {}
+    for name, options in (config or DEFAULT_ESTIMATORS).items():
+        options = dict(options)
+        estimator_type = options.pop("type", name)
+        if estimator_type not in ESTIMATORS:
+            raise ValueError(
+                f"Unknown type '{estimator_type}' of CNP estimator '{name}'. Expected one of {list(ESTIMATORS)}."
+            )
+        estimators[name] = partial(ESTIMATORS[estimator_type], **options)
+    return estimators
+
+
+def estimator_columns(columns: List[str], config: Optional[Dict[str, Dict[str, Any]]] = None) -> List[str]:
+    """
+    Names of ``columns`` for every estimator of ``config``: the first estimator gives
+    the columns themselves, the others add them suffixed with their name.
+    """
+    names = list(config or DEFAULT_ESTIMATORS)
+    return [column if i == 0 else f"{column}_{name}" for i, name in enumerate(names) for column in columns]
@@ -3,25 +3,57 @@ This is a boilerplate pipeline 'CNP_calculations'
 generated using Kedro 0.19.11
 """
 
+import hashlib
+import inspect
+import json
+from functools import lru_cache, partial
 import numpy as np
-from typing import Dict, Callable
+from typing import Any, Dict, Callable, List, NamedTuple, Optional, Tuple
 import pandas as pd
+import logging
 
+from nanolab_processing_base.extras.datasets.nanolab_dataframe import PARSER_VERSION
+from nanolab_processing_base.parallel import DEFAULT_EXECUTOR, imap_ordered
+from nanolab_processing_base import sweeps as sweeps_module
+from nanolab_processing_base.projects import project_chip_sample
+from nanolab_processing_base.pipelines.CNP_calculations import estimators as estimators_module
+from nanolab_processing_base.pipelines.CNP_calculations.estimators import (
+    CNP_FIT_POINTS,
+    DEFAULT_ESTIMATORS,
+    estimator_columns,
+    fit_CNPs,
+    make_estimators,
+    pad_sweeps,
+)
+from nanolab_processing_base.stress_events import add_stress_deltas, next_positions, previous_positions
+from nanolab_processing_base.sweeps import backward_sweep, forward_sweep
 
-def normalize_key(key: str) -> str:
-    """Normalize path separators to forward slashes for cross-platform compatibility."""
-    return key.replace("\\", "/")
+logger = logging.getLogger(__name__)
+
+# Version of the CNP fitting code, part of the fingerprints of the cached CNPs.
+# The source of the estimators and of the sweep segmentation is part of them too
+# (see fit_source_hash), so bump it only when a change elsewhere (e.g. in
+# fit_experiments) changes the fitted values.
+CNP_FIT_VERSION = 1
 
+CNP_COLUMNS = [
+    "CNP_gate_voltage_forward",
+    "CNP_drain_resistance_forward",
+    "CNP_gate_voltage_backward",
+    "CNP_drain_resistance_backward",
+]
+# Fitted values of each estimator, as returned by fit_experiments and stored in the CNP caches
+CNP_FIT_COLUMNS = [
+    "CNP_gate_voltage_forward",
+    "CNP_drain_voltage_forward",
+    "CNP_gate_voltage_backward",
+    "CNP_drain_voltage_backward",
+]
 
-def get_forward(df):
-    forward = df["Vg (V)"].diff() > 0
-    return df[forward | forward.shift(-1, fill_value=False)]
 
-def get_backward(df):
-    dv = df["Vg (V)"].diff()
-    mask = (dv < 0) | (dv.shift(-1) < 0)
-    out = df[mask]
-    return out.sort_values(by="Vg (V)")
+def normalize_key(key: str) -> str:
+    """Normalize path separators to forward slashes for cross-platform compatibility."""
+    return key.replace("\\", "/")
 
 
 def get_CNP(df):
@@ -40,61 +72,386 @@ def get_CNP(df):
     return CNP_gate_voltage, CNP_drain_voltage
 
 
-def get_partitioned_CNPs(data: Dict[str, Callable], props: pd.DataFrame) -> pd.DataFrame:
+def get_CNPs(sweeps: List[pd.DataFrame], n_points: int = CNP_FIT_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fits the CNP of many sweeps (DataFrames) in one vectorized pass, see fit_CNPs.
+    """
+    arrays = [(sweep["Vg (V)"].to_numpy(dtype=float), sweep["VDS (V)"].to_numpy(dtype=float)) for sweep in sweeps]
+    return fit_CNPs(*pad_sweeps(arrays), n_points=n_points)
 
-    # Normalize data_key column for cross-platform compatibility (handles backslashes from Windows)
-    props["data_key"] = props["data_key"].apply(normalize_key)
-    
-    # temporary set 'data_key' to be the index of the props dataframe, at the end of the function we will reset the index and set the column back to 'data_key'
-    props = props.set_index("data_key")
 
+def load_experiment(experiment_callable: Callable) -> pd.DataFrame:
+    try:
+        return experiment_callable()
+    except:
+        return experiment_callable
+
+
+def fit_experiments(
+    experiment_callables: List[Callable], estimators: Optional[Dict[str, Dict[str, Any]]] = None
+) -> np.ndarray:
+    """
+    Loads VVg experiments and estimates the CNPs of their forward and backward sweeps
+    in one batch per estimator, so the data is loaded once for all the estimators.
+    Runs in the worker processes of the parallel mode, so only the small results array
+    is sent back.
+
+    Args:
+        experiment_callables: Partition loaders of the experiments.
+        estimators: The 'estimators' parameters (see make_estimators).
+
+    Returns:
+        np.ndarray: One row per experiment, with the values of CNP_FIT_COLUMNS for
+        every estimator (see estimator_columns).
+    """
+    forward_sweeps = []
+    backward_sweeps = []
+    for experiment_callable in experiment_callables:
+        df = load_experiment(experiment_callable)
+        vg = df["Vg (V)"].to_numpy(dtype=float)
+        vds = df["VDS (V)"].to_numpy(dtype=float)
+        # Views of the two columns, copied only once into the stacked arrays
+        forward_sweeps.append(forward_sweep(vg, vds))
+        backward_sweeps.append(backward_sweep(vg, vds))
+    fitted = []
+    for estimator in make_estimators(estimators).values():
+        fitted.extend(estimator(forward_sweeps) + estimator(backward_sweeps))
+    return np.column_stack(fitted)
+
+
+def vvg_experiments(data: Dict[str, Callable], props: pd.DataFrame) -> Tuple[List[str], List[Callable]]:
+    """
+    Selects the VVg experiments of a project.
+
+    Args:
+        data: Partition loaders of the project, keyed by data_key.
+        props: Properties of the project, indexed by normalized data_key.
+
+    Returns:
+        Tuple[List[str], List[Callable]]: The normalized data_keys and the loaders.
+    """
+    keys = []
+    experiment_callables = []
     for key, experiment_callable in data.items():
         # Normalize the key to use forward slashes (cross-platform compatibility)
         normalized_key = normalize_key(key)
         # first we check that the experiment type is VVg
         if props.loc[normalized_key, "Procedure type"] != "VVg":
             continue
-        try:
-            df = experiment_callable()
-        except:
-            df = experiment_callable
-
-        forward = get_forward(df)
-        backward = get_backward(df)
-        forward_CNP_gate_voltage, forward_CNP_drain_voltage = get_CNP(forward)
-        backward_CNP_gate_voltage, backward_CNP_drain_voltage = get_CNP(backward)
-
-        forward_CNP_drain_resistance = forward_CNP_drain_voltage / props.loc[normalized_key, "Drain-Source current"]
-        backward_CNP_drain_resistance = backward_CNP_drain_voltage / props.loc[normalized_key, "Drain-Source current"]
-
-        props.loc[normalized_key, "CNP_gate_voltage_forward"] = forward_CNP_gate_voltage
-        props.loc[normalized_key, "CNP_drain_resistance_forward"] = forward_CNP_drain_resistance
-        props.loc[normalized_key, "CNP_gate_voltage_backward"] = backward_CNP_gate_voltage
-        props.loc[normalized_key, "CNP_drain_resistance_backward"] = backward_CNP_drain_resistance
+        keys.append(normalized_key)
+        experiment_callables.append(experiment_callable)
+    return keys, experiment_callables
+
+
+def fit_partitioned_CNPs(experiment_callables: List[Callable], parameters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    """
+    Loads and fits VVg experiments in chunks of 'chunk_size'. With 'max_workers' above 1
+    the chunks go to a pool of workers, which receive the partition loaders (not the
+    data) and return only the fitted values.
+
+    Returns:
+        np.ndarray: One row per experiment, with the values of CNP_FIT_COLUMNS for
+        every estimator of the 'estimators' parameters.
+    """
+    parameters = parameters or {}
+    chunk_size = parameters.get("chunk_size") or len(experiment_callables) or 1
+    estimators = parameters.get("estimators")
+
+    chunks = [
+        (str(start), experiment_callables[start:start + chunk_size])
+        for start in range(0, len(experiment_callables), chunk_size)
+    ]
+    results = [np.empty((0, len(estimator_columns(CNP_FIT_COLUMNS, estimators))))]
+    for _, chunk_results, error in imap_ordered(
+        partial(fit_experiments, estimators=estimators),
+        chunks,
+        max_workers=parameters.get("max_workers", 1),
+        executor=parameters.get("executor", DEFAULT_EXECUTOR),
+    ):
+        if error is not None:
+            raise error
+        results.append(chunk_results)
+    return np.concatenate(results)
+
+
+def attach_CNPs(
+    props: pd.DataFrame,
+    keys: List[str],
+    fitted: np.ndarray,
+    estimators: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> pd.DataFrame:
+    """
+    Joins the fitted CNPs of ``keys`` to props (indexed by data_key) in one go and
+    resets the index. Rows of other experiments get NaN. Every estimator gives its
+    CNP_COLUMNS, named by estimator_columns.
+    """
+    drain_source_currents = props.loc[keys, "Drain-Source current"].to_numpy(dtype=float)
+
+    values = {}
+    columns = estimator_columns(CNP_COLUMNS, estimators)
+    for start in range(0, len(columns), len(CNP_COLUMNS)):
+        forward_CNP_gate_voltages, forward_CNP_drain_voltages, backward_CNP_gate_voltages, backward_CNP_drain_voltages = (
+            fitted[:, start:start + len(CNP_COLUMNS)].T
+        )
+        values.update(zip(columns[start:start + len(CNP_COLUMNS)], [
+            forward_CNP_gate_voltages,
+            forward_CNP_drain_voltages / drain_source_currents,
+            backward_CNP_gate_voltages,
+            backward_CNP_drain_voltages / drain_source_currents,
+        ]))
+
+    CNPs = pd.DataFrame(values, index=pd.Index(keys, name="data_key"))
+    props = props.drop(columns=columns, errors="ignore").join(CNPs)
+    return props.reset_index()
+
+
+def get_partitioned_CNPs(
+    data: Dict[str, Callable], props: pd.DataFrame, parameters: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """
+    Computes the forward and backward CNP gate voltage and drain resistance of every
+    VVg experiment of a project.
+
+    Args:
+        data: Partition loaders of the project, keyed by data_key.
+        props: Properties of the project.
+        parameters: The 'CNP_calculations' parameters (max_workers, executor, chunk_size,
+            estimators).
+
+    Returns:
+        pd.DataFrame: props with the CNP columns, NaN for the other experiments.
+    """
+    # Normalize data_key column for cross-platform compatibility (handles backslashes from Windows),
+    # on a copy so that the caller's props are left untouched
+    props = props.assign(data_key=props["data_key"].map(normalize_key))
     
-    props.reset_index(inplace=True)
-        
-    return props
+    # temporary set 'data_key' to be the index of the props dataframe, at the end of the function we will reset the index and set the column back to 'data_key'
+    props = props.set_index("data_key")
+
+    estimators = (parameters or {}).get("estimators")
+    make_estimators(estimators)  # Fail on unknown estimators before loading any data
+    keys, experiment_callables = vvg_experiments(data, props)
+    fitted = fit_partitioned_CNPs(experiment_callables, parameters)
+    return attach_CNPs(props, keys, fitted, estimators)
+
+
+@lru_cache(maxsize=None)
+def fit_source_hash() -> str:
+    """
+    Hash of the source of the modules the CNP fits are computed with: the estimators
+    and the forward/backward sweep segmentation.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for module in (estimators_module, sweeps_module):
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()
+
+
+def CNP_fingerprint(content_hash: Optional[str], estimators: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[str]:
+    """
+    Fingerprint of the CNPs of an experiment: the hash of its raw file, with the parser
+    and fitting versions, the source of the fitting code and the estimators settings.
+    None when the hash is unknown.
+    """
+    if content_hash is None:
+        return None
+    settings = json.dumps(estimators or DEFAULT_ESTIMATORS, sort_keys=True)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{content_hash}:{PARSER_VERSION}:{CNP_FIT_VERSION}:{fit_source_hash()}:{settings}".encode())
+    return digest.hexdigest()
+
+
+def get_incremental_partitioned_CNPs(
+    data: Dict[str, Callable],
+    props: pd.DataFrame,
+    manifest: Dict[str, Dict],
+    previous_CNPs: pd.DataFrame,
+    parameters: Optional[Dict[str, Any]] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Same as get_partitioned_CNPs, but only the VVg experiments that are new or whose
+    raw file changed are loaded and fitted; the CNPs of the others are taken from the
+    previous run.
+
+    Args:
+        data: Partition loaders of the project, keyed by data_key.
+        props: Properties of the project.
+        manifest: Ingestion manifest of the project (raw file hash of each data_key).
+        previous_CNPs: CNP cache written by the previous run (empty on the first run).
+        parameters: The 'CNP_calculations' parameters (max_workers, executor, chunk_size,
+            estimators).
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: props with the CNP columns, and the updated
+        CNP cache (data_key, fingerprint and the fitted columns of every VVg experiment).
+    """
+    estimators = (parameters or {}).get("estimators")
+    make_estimators(estimators)  # Fail on unknown estimators before loading any data
+    plan = plan_incremental_CNPs(data, props, manifest, previous_CNPs, estimators)
+    fitted = fit_partitioned_CNPs(plan.callables_to_fit(), parameters)
+    return finish_incremental_CNPs(plan, fitted, estimators)
+
+
+class IncrementalCNPs(NamedTuple):
+    """
+    The VVg experiments of a project and the CNPs already known, before fitting.
+
+    Attributes:
+        props: Properties of the project, indexed by normalized data_key.
+        keys: The data_keys of the VVg experiments.
+        fingerprints: Their CNP fingerprints (see CNP_fingerprint).
+        to_fit: Positions of the experiments that are new or changed.
+        experiment_callables: Partition loaders of all the experiments.
+        fitted: Fitted values of all the experiments, filled for the unchanged ones.
+    """
+    props: pd.DataFrame
+    keys: List[str]
+    fingerprints: List[Optional[str]]
+    to_fit: List[int]
+    experiment_callables: List[Callable]
+    fitted: np.ndarray
+
+    def callables_to_fit(self) -> List[Callable]:
+        return [self.experiment_callables[i] for i in self.to_fit]
+
+
+def plan_incremental_CNPs(
+    data: Dict[str, Callable],
+    props: pd.DataFrame,
+    manifest: Dict[str, Dict],
+    previous_CNPs: pd.DataFrame,
+    estimators: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> IncrementalCNPs:
+    """
+    First step of get_incremental_partitioned_CNPs: finds the VVg experiments of a
+    project and takes the CNPs of the unchanged ones from the previous run.
+    """
+    props = props.assign(data_key=props["data_key"].map(normalize_key))
+    props = props.set_index("data_key")
+
+    fit_columns = estimator_columns(CNP_FIT_COLUMNS, estimators)
+    keys, experiment_callables = vvg_experiments(data, props)
+    fingerprints = [CNP_fingerprint(manifest.get(key, {}).get("hash"), estimators) for key in keys]
+
+    cached = {}
+    if not previous_CNPs.empty:
+        previous_CNPs = previous_CNPs.drop_duplicates("data_key", keep="last").set_index("data_key")
+        cached_fingerprints = previous_CNPs["fingerprint"].to_dict()
+        cached = {
+            i: key for i, (key, fingerprint) in enumerate(zip(keys, fingerprints))
+            if fingerprint is not None and cached_fingerprints.get(key) == fingerprint
+        }
+    to_fit = [i for i in range(len(keys)) if i not in cached]
+
+    fitted = np.empty((len(keys), len(fit_columns)))
+    if cached:
+        fitted[list(cached)] = previous_CNPs.loc[list(cached.values()), fit_columns].to_numpy(dtype=float)
+    return IncrementalCNPs(props, keys, fingerprints, to_fit, experiment_callables, fitted)
 
 
-def after_stress_CNP_calculations(props: pd.DataFrame) -> pd.DataFrame:
+def finish_incremental_CNPs(
+    plan: IncrementalCNPs,
+    fitted: np.ndarray,
+    estimators: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Last step of get_incremental_partitioned_CNPs: fills in the values fitted for the
+    experiments to fit of ``plan`` (see plan_incremental_CNPs), then builds the props
+    with the CNP columns and the updated CNP cache.
+    """
+    plan.fitted[plan.to_fit] = fitted
+    logger.info(f"Fitted the CNPs of {len(plan.to_fit)} experiments, reused {len(plan.keys) - len(plan.to_fit)}")
+
+    CNPs = pd.DataFrame(plan.fitted, columns=estimator_columns(CNP_FIT_COLUMNS, estimators))
+    CNPs.insert(0, "data_key", plan.keys)
+    CNPs.insert(1, "fingerprint", pd.Series(plan.fingerprints, dtype=object))
+    return attach_CNPs(plan.props, plan.keys, plan.fitted, estimators), CNPs
+
+
+# Number of inputs of each project of get_batched_incremental_CNPs
+N_PROJECT_INPUTS = 5
+
+
+def get_batched_incremental_CNPs(parameters: Optional[Dict[str, Any]], *project_inputs: Any) -> List[pd.DataFrame]:
+    """
+    get_incremental_partitioned_CNPs and after_stress_CNP_calculations for many projects
+    in one node: the experiments to fit of all the projects are fitted as one job, in
+    chunks spread over the pool of workers (see fit_partitioned_CNPs).
+
+    Args:
+        parameters: The 'CNP_calculations' parameters.
+        *project_inputs: For each project, in turn: its partition loaders, props,
+            manifest, previous CNP cache and stress-event index.
+
+    Returns:
+        List[pd.DataFrame]: For each project, in turn: its props with the CNP columns,
+        its updated CNP cache and its rows around the stresses.
+    """
+    estimators = (parameters or {}).get("estimators")
+    make_estimators(estimators)  # Fail on unknown estimators before loading any data
+    projects = [
+        project_inputs[start:start + N_PROJECT_INPUTS] for start in range(0, len(project_inputs), N_PROJECT_INPUTS)
+    ]
+
+    plans = []
+    experiment_callables = []
+    for data, props, manifest, previous_CNPs, _ in projects:
+        plan = plan_incremental_CNPs(data, props, manifest, previous_CNPs, estimators)
+        plans.append(plan)
+        experiment_callables.extend(plan.callables_to_fit())
+    fitted = fit_partitioned_CNPs(experiment_callables, parameters)
+
+    outputs = []
+    start = 0
+    for plan, (_, _, _, _, stress_events) in zip(plans, projects):
+        stop = start + len(plan.to_fit)
+        props, CNPs = finish_incremental_CNPs(plan, fitted[start:stop], estimators)
+        outputs.extend([props, CNPs, after_stress_CNP_calculations(props, stress_events)])
+        start = stop
+    return outputs
+
+
+def after_stress_CNP_calculations(props: pd.DataFrame, stress_events: pd.DataFrame) -> pd.DataFrame:
     """
     This function takes a props and returns only the rows that are immediate before and after a stress experiment.
+
+    The rows after a stress get the change of their CNP values since the row before that stress
+    ('delta_' columns, for every CNP estimator), all computed in one pass from the
+    stress-event index of the project.
     """
     props = props.sort_values(by="Start time").copy()
     props["VG"] = props["VG"].ffill()
-    # Find indices where "Procedure type" is "Stress"
-    stress_idx = props.index[props["Procedure type"] == "Stress"]
-    # Get the next row index after each "Stress" (if within bounds)
-    previous_idx = [i - 1 for i in stress_idx if (i - 1) in props.index]
-    next_idx = [i + 1 for i in stress_idx if (i + 1) in props.index]
-    # for the rows that are after the stress, we add the value of the CNP values of that row minus the value of the CNP values of the previous row
-    for i in next_idx:
-        props.loc[i, "delta_CNP_gate_voltage_forward"] = props.loc[i, "CNP_gate_voltage_forward"] - props.loc[i - 2, "CNP_gate_voltage_forward"]
-        props.loc[i, "delta_CNP_drain_resistance_forward"] = props.loc[i, "CNP_drain_resistance_forward"] - props.loc[i - 2, "CNP_drain_resistance_forward"]
-        # also for backward
-        props.loc[i, "delta_CNP_gate_voltage_backward"] = props.loc[i, "CNP_gate_voltage_backward"] - props.loc[i - 2, "CNP_gate_voltage_backward"]
-        props.loc[i, "delta_CNP_drain_resistance_backward"] = props.loc[i, "CNP_drain_resistance_backward"] - props.loc[i - 2, "CNP_drain_resistance_backward"]
-    # Select those rows
-    props = props.loc[previous_idx + next_idx]
-    return props
\ No newline at end of file
+    CNP_columns = [column for column in props.columns if column.startswith(tuple(CNP_COLUMNS))]
+    props = add_stress_deltas(props, stress_events, CNP_columns)
+    # Select the rows before the stresses, then the rows after them
+    positions = np.concatenate([previous_positions(props, stress_events), next_positions(props, stress_events)])
+    return props.iloc[positions]
+
+
+def consolidate_properties(*all_props: pd.DataFrame, projects: List[str]) -> pd.DataFrame:
+    """
+    Stacks the props of every project into one typed table for the properties store,
+    with the chip and sample of each row as categorical 'chip' and 'sample' columns.
+
+    Args:
+        *all_props: Props of each project, in the order of ``projects``.
+        projects: Names of the project datasets (e.g. "project_CHIP1A").
+
+    Returns:
+        pd.DataFrame: The props of all the projects.
+    """
+    chips, samples = zip(*map(project_chip_sample, projects))
+    props = pd.concat(
+        [project_props.assign(chip=chip, sample=sample) for project_props, chip, sample in zip(all_props, chips, samples)],
+        ignore_index=True,
+    )
+    props["chip"] = pd.Categorical(props["chip"], categories=list(dict.fromkeys(chips)))
+    props["sample"] = pd.Categorical(props["sample"], categories=sorted(set(samples)))
+    props["Start time"] = pd.to_datetime(props["Start time"], format="ISO8601", errors="coerce")
+    props["Procedure type"] = props["Procedure type"].astype("category")
+
+    # Columns mixing strings with other values (e.g. numbers) are stored as strings
+    for column in props.columns[props.dtypes == object]:
+        if pd.api.types.infer_dtype(props[column], skipna=True).startswith("mixed"):
+            props[column] = props[column].where(props[column].isna(), props[column].astype(str))
+    return props
@@ -11,6 +11,8 @@ import nanoplot as nplt
 import pandas as pd
 from typing import Dict, Callable
 
+from nanolab_processing_base.sweeps import forward_sweep
+
 nplt.apply()
 
 
@@ -19,55 +21,41 @@ def normalize_key(key: str) -> str:
     return key.replace("\\", "/")
 
 
-def get_forward(df: pd.DataFrame) -> pd.DataFrame:
-    """Extract only the forward sweep from a VVg experiment."""
-    forward = df["Vg (V)"].diff() > 0
-    return df[forward | forward.shift(-1, fill_value=False)]
-
-
-def get_after_annealing_vvg_keys(props: pd.DataFrame) -> list[str]:
+def get_after_annealing_vvg_keys(stress_events: pd.DataFrame) -> list[str]:
     """
     Get the data_key values for VVg experiments that occur just before stress.
     These are the experiments "after annealing" - the baseline measurements
     before each stress cycle.
 
     Args:
-        props: DataFrame with properties (must have 'Start time', 'Procedure type', 'data_key').
+        stress_events: Stress-event index of the project (stress_events_project_CHIPXY),
+            in Start time order.
 
     Returns:
         List of data_key values for VVg rows immediately before stress experiments.
     """
-    props = props.sort_values(by="Start time").reset_index(drop=True).copy()
-
-    # Find indices where "Procedure type" is "Stress"
-    stress_idx = props.index[props["Procedure type"] == "Stress"]
-
-    # Get the row index just before each "Stress" (these are VVg after annealing)
-    previous_idx = [i - 1 for i in stress_idx if (i - 1) in props.index]
-
-    # Get the data_keys for these rows
-    after_annealing_keys = props.loc[previous_idx, "data_key"].tolist()
-
-    return after_annealing_keys
+    return stress_events["previous_key"].dropna().tolist()
 
 
 def create_first_last_resistance_plot(
     data: Dict[str, Callable],
     props: pd.DataFrame,
+    stress_events: pd.DataFrame,
 ) -> plt.Figure:
     """
     Create a plot comparing the first and last VVg after annealing.
     Shows Resistance vs Vg for both experiments.
 
     Args:
-        data: Partitioned dataset with raw VVg data.
+        data: Loaders of the per-experiment data, keyed by data_key (e.g. data_project_CHIP3A_sweeps).
         props: DataFrame with properties including 'Drain-Source current'.
+        stress_events: Stress-event index of the same project (e.g. stress_events_project_CHIP3A).
 
     Returns:
         matplotlib Figure object with the comparison plot.
     """
     # Get the data_keys for VVg experiments after annealing
-    after_annealing_keys = get_after_annealing_vvg_keys(props)
+    after_annealing_keys = get_after_annealing_vvg_keys(stress_events)
 
     if len(after_annealing_keys) < 2:
         # Not enough data to compare
@@ -117,26 +105,26 @@ def create_first_last_resistance_plot(
         return fig
 
     # Get only forward sweep
-    first_df = get_forward(first_df.copy())
-    last_df = get_forward(last_df.copy())
+    first_vg, first_vds = forward_sweep(first_df["Vg (V)"].to_numpy(dtype=float), first_df["VDS (V)"].to_numpy(dtype=float))
+    last_vg, last_vds = forward_sweep(last_df["Vg (V)"].to_numpy(dtype=float), last_df["VDS (V)"].to_numpy(dtype=float))
 
     # Calculate resistance in kOhm: R = V / I = VDS / Drain-Source current
-    first_df["Resistance"] = first_df["VDS (V)"] / first_current / 1000
-    last_df["Resistance"] = last_df["VDS (V)"] / last_current / 1000
+    first_resistance = first_vds / first_current / 1000
+    last_resistance = last_vds / last_current / 1000
 
     fig, ax = plt.subplots()
 
     # Plot first VVg (after first annealing)
     ax.plot(
-        first_df["Vg (V)"],
-        first_df["Resistance"],
+        first_vg,
+        first_resistance,
         label="First (after annealing)",
     )
 
     # Plot last VVg (after last annealing)
     ax.plot(
-        last_df["Vg (V)"],
-        last_df["Resistance"],
+        last_vg,
+        last_resistance,
         label="Last (after annealing)",
     )
 
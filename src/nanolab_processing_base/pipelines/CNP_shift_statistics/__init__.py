@@ -0,0 +1,10 @@
+"""
+This is a boilerplate pipeline 'CNP_shift_statistics'
+generated using Kedro 0.19.11
+"""
+
+from .pipeline import create_pipeline
+
+__all__ = ["create_pipeline"]
+
+__version__ = "0.1"
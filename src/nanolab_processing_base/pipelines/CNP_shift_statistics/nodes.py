@@ -0,0 +1,164 @@
+"""
+This is a boilerplate pipeline 'CNP_shift_statistics'
+generated using Kedro 0.19.11
+"""
+
+import numpy as np
+import pandas as pd
+
+from nanolab_processing_base.extras.datasets.properties_store import PropertiesStore
+
+# Maximum absolute delta CNP gate voltage (V) to include in plots (filter outliers)
+DELTA_CNP_OUTLIER_THRESHOLD = 40
+
+# Size groupings: pairs of sample letters that correspond to the same chip size
+# A & B = size 1, C & D = size 2, E & F = size 3, G & H = size 4, I & J = size 5
+SIZE_GROUPS = {
+    "Size 1 (A,B)": ["A", "B"],
+    "Size 2 (C,D)": ["C", "D"],
+    "Size 3 (E,F)": ["E", "F"],
+    "Size 4 (G,H)": ["G", "H"],
+    "Size 5 (I,J)": ["I", "J"],
+}
+
+SHIFT_COLUMN = "delta_CNP_gate_voltage_forward"
+
+# Reach of the boxplot whiskers beyond the quartiles, in interquartile ranges
+# (matplotlib's default)
+WHISKER_RANGE = 1.5
+
+# Columns of the box statistics, named as matplotlib's Axes.bxp expects them
+BOX_STATS_COLUMNS = ["mean", "med", "q1", "q3", "whislo", "whishi", "fliers"]
+
+
+def aggregate_CNP_shifts(store: PropertiesStore) -> pd.DataFrame:
+    """
+    Statistics of the forward CNP shifts of every (chip, sample, stress VG) group, in a
+    single groupby pass over the after-stress properties of all the projects.
+
+    Outliers (absolute shift above DELTA_CNP_OUTLIER_THRESHOLD) and missing shifts
+    are left out of the statistics. Groups whose shifts are all left out are kept,
+    with a count of 0, so that their stress VG still shows in the plots that list
+    every stress VG of a sample.
+
+    Args:
+        store: Properties store with the CNP calculations after stress (properties_store_after_stress).
+
+    Returns:
+        pd.DataFrame: One row per group, sorted by chip, sample and VG, with the columns
+        'chip', 'sample', 'size_group' (see SIZE_GROUPS), 'VG', 'count', 'mean', 'q25',
+        'median', 'q75' and 'values' (the array of the shifts, in measurement order).
+    """
+    props = store.read(columns=["chip", "sample", "VG", SHIFT_COLUMN])
+    props = props[props["VG"].notna()]
+
+    shifts = props[SHIFT_COLUMN].where(props[SHIFT_COLUMN].abs() <= DELTA_CNP_OUTLIER_THRESHOLD)
+    groups = shifts.groupby([props["chip"], props["sample"], props["VG"]], observed=True, sort=True)
+    stats = pd.DataFrame(
+        {
+            "count": groups.count(),
+            "mean": groups.mean(),
+            "q25": groups.quantile(0.25),
+            "median": groups.median(),
+            "q75": groups.quantile(0.75),
+        }
+    )
+    stats["values"] = [group.dropna().to_numpy() for _, group in groups]
+    stats = stats.reset_index()
+
+    size_groups = {letter: size_name for size_name, letters in SIZE_GROUPS.items() for letter in letters}
+    stats.insert(2, "size_group", stats["sample"].astype(str).map(size_groups))
+    return stats
+
+
+def select_samples(stats: pd.DataFrame, samples: dict[str, list[str]]) -> pd.DataFrame:
+    """
+    Rows of the given samples of each chip, e.g. ``{"CHIP1": ["A", "B"]}``.
+    """
+    selected = np.zeros(len(stats), dtype=bool)
+    for chip, letters in samples.items():
+        selected |= (stats["chip"] == chip).to_numpy() & stats["sample"].isin(letters).to_numpy()
+    return stats[selected]
+
+
+def pooled_values(stats: pd.DataFrame, by: list[str]) -> pd.Series:
+    """
+    Shifts of the groups of ``stats`` pooled by the ``by`` columns, as one array per
+    group, in the order of the rows of ``stats``. Groups without shifts are left out.
+    """
+    stats = stats[stats["count"] > 0]
+    return stats.groupby(by, observed=True, sort=True)["values"].agg(lambda values: np.concatenate(values.tolist()))
+
+
+def _percentiles(values: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """
+    Percentile ``q`` (0-100) of each group of sorted ``values`` (the groups are the
+    runs starting at ``starts``), interpolated linearly as np.percentile does.
+    """
+    index = (counts - 1) * (q / 100)
+    below = np.floor(index).astype(int)
+    above = np.minimum(below + 1, counts - 1)
+    weight = index - below
+    low, high = values[starts + below], values[starts + above]
+    difference = high - low
+    return np.where(weight >= 0.5, high - difference * (1 - weight), low + difference * weight)
+
+
+def box_statistics(stats: pd.DataFrame, samples: dict[str, list[str]]) -> pd.DataFrame:
+    """
+    Box statistics of the CNP shifts of the given samples of each chip, pooled by chip
+    and stress VG, computed for all the groups at once (same definitions as
+    matplotlib's boxplot, with whiskers at WHISKER_RANGE interquartile ranges).
+
+    Args:
+        stats: Statistics of the CNP shifts (CNP_shift_stats).
+        samples: Samples to include for each chip, e.g. ``{"CHIP1": ["A", "B"]}``.
+
+    Returns:
+        pd.DataFrame: One row per (chip, VG) group with shifts, sorted by chip and VG,
+        with the columns 'chip', 'VG', 'count' and BOX_STATS_COLUMNS ('fliers' is the
+        array of the shifts beyond the whiskers).
+    """
+    selected = select_samples(stats, samples)
+    selected = selected[selected["count"] > 0]
+    groups = selected.groupby(["chip", "VG"], observed=True, sort=True)
+    boxes = groups["count"].sum().reset_index()
+
+    # All the shifts in one array, with the number of their group
+    shifts = np.concatenate([np.empty(0), *selected["values"]])
+    group_ids = np.repeat(groups.ngroup().to_numpy(), selected["count"].to_numpy())
+
+    counts = boxes["count"].to_numpy()
+    starts = np.cumsum(counts) - counts
+    ordered = shifts[np.lexsort((shifts, group_ids))]
+
+    q1 = _percentiles(ordered, starts, counts, 25)
+    med = _percentiles(ordered, starts, counts, 50)
+    q3 = _percentiles(ordered, starts, counts, 75)
+    iqr = q3 - q1
+
+    # Whiskers at the most extreme shifts within reach, never inside the box
+    reach_low = (q1 - WHISKER_RANGE * iqr)[group_ids]
+    reach_high = (q3 + WHISKER_RANGE * iqr)[group_ids]
+    lowest = np.full(len(boxes), np.inf)
+    np.minimum.at(lowest, group_ids, np.where(shifts >= reach_low, shifts, np.inf))
+    highest = np.full(len(boxes), -np.inf)
+    np.maximum.at(highest, group_ids, np.where(shifts <= reach_high, shifts, -np.inf))
+    whislo = np.where(lowest > q1, q1, lowest)
+    whishi = np.where(highest < q3, q3, highest)
+
+    # Fliers of each group: the low ones, then the high ones, in measurement order
+    is_low = shifts < whislo[group_ids]
+    is_high = shifts > whishi[group_ids]
+    flier_positions = np.flatnonzero(is_low | is_high)
+    flier_positions = flier_positions[np.lexsort((is_high[flier_positions], group_ids[flier_positions]))]
+    flier_counts = np.bincount(group_ids[flier_positions], minlength=len(boxes))
+
+    boxes["mean"] = np.bincount(group_ids, weights=shifts, minlength=len(boxes)) / counts
+    boxes["med"] = med
+    boxes["q1"] = q1
+    boxes["q3"] = q3
+    boxes["whislo"] = whislo
+    boxes["whishi"] = whishi
+    boxes["fliers"] = np.split(shifts[flier_positions], np.cumsum(flier_counts))[:-1]
+    return boxes
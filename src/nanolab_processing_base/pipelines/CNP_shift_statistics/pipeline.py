@@ -0,0 +1,23 @@
+"""
+This is a boilerplate pipeline 'CNP_shift_statistics'
+generated using Kedro 0.19.11
+"""
+
+from kedro.pipeline import Pipeline, node, pipeline
+
+from .nodes import aggregate_CNP_shifts
+
+
+def create_pipeline(**kwargs) -> Pipeline:
+    # Statistics of the CNP shifts of all chips, samples and stress VGs, shared by the
+    # boxplots, heatmaps and size comparison
+    nodes = [
+        node(
+            func=aggregate_CNP_shifts,
+            inputs="properties_store_after_stress",
+            outputs="CNP_shift_stats",
+            name="aggregate_CNP_shifts",
+        ),
+    ]
+
+    return pipeline(nodes)
@@ -11,14 +11,13 @@ import nanoplot as nplt
 import numpy as np
 import pandas as pd
 
-nplt.apply()
+from nanolab_processing_base.pipelines.CNP_shift_statistics.nodes import select_samples
 
-# Maximum absolute delta CNP gate voltage (V) to include in plots (filter outliers)
-DELTA_CNP_OUTLIER_THRESHOLD = 40
+nplt.apply()
 
 
 def create_cnp_shift_heatmap(
-    *sample_props: pd.DataFrame,
+    stats: pd.DataFrame,
     chip_name: str,
     sample_letters: list[str],
 ) -> plt.Figure:
@@ -28,36 +27,25 @@ def create_cnp_shift_heatmap(
     affects the shifts.
 
     Args:
-        *sample_props: DataFrames with CNP calculations after stress for each sample,
-                       in the same order as sample_letters.
+        stats: Statistics of the CNP shifts (CNP_shift_stats), outliers already left out.
         chip_name: Name of the chip (e.g., "CHIP1") for the plot title.
         sample_letters: List of sample letters in order (e.g., ["A", "B", "C", ...]).
 
     Returns:
         matplotlib Figure object with the heatmap.
     """
+    chip_stats = select_samples(stats, {chip_name: sample_letters})
+
     # Get all unique VG values across all samples
-    all_vg = set()
-    for props in sample_props:
-        all_vg.update(props["VG"].dropna().unique())
-    all_vg = sorted(all_vg)
+    all_vg = sorted(chip_stats["VG"].unique())
 
     # Create a 2D array for the heatmap (VG x samples)
     # Each cell is the mean CNP shift for that sample at that VG
-    heatmap_data = np.full((len(all_vg), len(sample_letters)), np.nan)
-
-    for j, (props, letter) in enumerate(zip(sample_props, sample_letters)):
-        # Filter out outliers
-        props_filtered = props[
-            props["delta_CNP_gate_voltage_forward"].abs() <= DELTA_CNP_OUTLIER_THRESHOLD
-        ]
-
-        for i, vg in enumerate(all_vg):
-            vg_data = props_filtered[props_filtered["VG"] == vg][
-                "delta_CNP_gate_voltage_forward"
-            ].dropna()
-            if len(vg_data) > 0:
-                heatmap_data[i, j] = vg_data.mean()
+    heatmap_data = (
+        chip_stats.pivot(index="VG", columns="sample", values="mean")
+        .reindex(index=all_vg, columns=sample_letters)
+        .to_numpy(dtype=float)
+    )
 
     fig, ax = plt.subplots()
 
@@ -5,59 +5,32 @@ generated using Kedro 0.19.11
 
 from functools import partial
 
-from kedro.pipeline import Pipeline, node, pipeline
+from kedro.pipeline import Pipeline, pipeline
+
+from nanolab_processing_base.reporting import ReportFigure, report_node
 
 from .nodes import create_cnp_shift_heatmap
 
 
 def create_pipeline(**kwargs) -> Pipeline:
     # Define sample letters for each chip (excluding removed samples: 3E, 4F)
-    chip1_samples = ["A", "B", "C", "D", "E", "F", "G", "H", "I"]
-    chip3_samples = ["A", "B", "C", "D", "F", "G", "H", "I", "J"]  # E removed
-    chip4_samples = ["A", "B", "C", "D", "E", "G", "H", "I", "J"]  # F removed
-
-    # Create input lists for each chip
-    chip1_inputs = [
-        f"properties_project_CHIP1{s}_with_CNPs_after_stress" for s in chip1_samples
-    ]
-    chip3_inputs = [
-        f"properties_project_CHIP3{s}_with_CNPs_after_stress" for s in chip3_samples
-    ]
-    chip4_inputs = [
-        f"properties_project_CHIP4{s}_with_CNPs_after_stress" for s in chip4_samples
-    ]
-
-    nodes = [
-        node(
-            func=partial(
-                create_cnp_shift_heatmap,
-                chip_name="CHIP1",
-                sample_letters=chip1_samples,
-            ),
-            inputs=chip1_inputs,
-            outputs="cnp_shift_heatmap_CHIP1",
-            name="create_cnp_shift_heatmap_CHIP1",
-        ),
-        node(
-            func=partial(
-                create_cnp_shift_heatmap,
-                chip_name="CHIP3",
-                sample_letters=chip3_samples,
-            ),
-            inputs=chip3_inputs,
-            outputs="cnp_shift_heatmap_CHIP3",
-            name="create_cnp_shift_heatmap_CHIP3",
-        ),
-        node(
-            func=partial(
+    samples = {
+        "CHIP1": ["A", "B", "C", "D", "E", "F", "G", "H", "I"],
+        "CHIP3": ["A", "B", "C", "D", "F", "G", "H", "I", "J"],  # E removed
+        "CHIP4": ["A", "B", "C", "D", "E", "G", "H", "I", "J"],  # F removed
+    }
+
+    figures = [
+        ReportFigure(
+            function=partial(
                 create_cnp_shift_heatmap,
-                chip_name="CHIP4",
-                sample_letters=chip4_samples,
+                chip_name=chip,
+                sample_letters=letters,
             ),
-            inputs=chip4_inputs,
-            outputs="cnp_shift_heatmap_CHIP4",
-            name="create_cnp_shift_heatmap_CHIP4",
-        ),
+            inputs=["CNP_shift_stats"],
+            output=f"cnp_shift_heatmap_{chip}",
+        )
+        for chip, letters in samples.items()
     ]
 
-    return pipeline(nodes)
+    return pipeline([report_node(figures, name="create_cnp_shift_heatmaps")])
@@ -8,16 +8,28 @@ import matplotlib
 matplotlib.use("Agg")  # Use non-interactive backend for headless execution
 import matplotlib.pyplot as plt
 import nanoplot as nplt
+import numpy as np
 import pandas as pd
 
+from nanolab_processing_base.pipelines.CNP_shift_statistics.nodes import BOX_STATS_COLUMNS
+
 nplt.apply()
 
-# Maximum absolute delta CNP gate voltage (V) to include in plots (filter outliers)
-DELTA_CNP_OUTLIER_THRESHOLD = 40
+# Box of a group without shifts, drawn as nothing (as matplotlib does for empty data)
+EMPTY_BOX = {"mean": np.nan, "med": np.nan, "q1": np.nan, "q3": np.nan, "whislo": np.nan, "whishi": np.nan, "fliers": []}
+
+
+def chip_boxes(box_stats: pd.DataFrame, chip_name: str, all_vg: list[float]) -> list[dict]:
+    """
+    Box statistics of a chip at each of ``all_vg``, as Axes.bxp takes them.
+    """
+    chip_stats = box_stats[box_stats["chip"] == chip_name].set_index("VG")[BOX_STATS_COLUMNS]
+    boxes = chip_stats.to_dict(orient="index")
+    return [boxes.get(vg, EMPTY_BOX) for vg in all_vg]
 
 
 def create_forward_cnp_boxplot_chip(
-    *sample_props: pd.DataFrame,
+    box_stats: pd.DataFrame,
     chip_name: str,
 ) -> plt.Figure:
     """
@@ -25,35 +37,21 @@ def create_forward_cnp_boxplot_chip(
     combining data from all samples (A, B, C, etc.) of that chip.
 
     Args:
-        *sample_props: DataFrames with CNP calculations after stress for each sample.
+        box_stats: Box statistics of the CNP shifts per chip and VG (forward_cnp_box_stats).
         chip_name: Name of the chip (e.g., "CHIP1") for the plot title.
 
     Returns:
         matplotlib Figure object with the boxplot.
     """
-    # Concatenate all samples from the same chip
-    combined_props = pd.concat(sample_props, ignore_index=True)
-
-    # Filter out outliers where delta exceeds threshold
-    combined_props = combined_props[
-        combined_props["delta_CNP_gate_voltage_forward"].abs()
-        <= DELTA_CNP_OUTLIER_THRESHOLD
-    ]
-
     fig, ax = plt.subplots()
 
     # Fixed VG values and tick marks (same as comparison plot)
-    all_vg = sorted(combined_props["VG"].dropna().unique())
+    all_vg = sorted(box_stats.loc[box_stats["chip"] == chip_name, "VG"])
     tick_vg = [-40, -20, 0, 20, 40]
 
-    data = []
-    for vg in all_vg:
-        vg_data = combined_props[combined_props["VG"] == vg][
-            "delta_CNP_gate_voltage_forward"
-        ].dropna()
-        data.append(vg_data.values if len(vg_data) > 0 else [])
+    data = chip_boxes(box_stats, chip_name, all_vg)
 
-    ax.boxplot(
+    ax.bxp(
         data,
         positions=range(len(all_vg)),
         showfliers=True,
@@ -74,53 +72,19 @@ def create_forward_cnp_boxplot_chip(
     return fig
 
 
-def create_forward_cnp_boxplot_comparison(
-    *all_props: pd.DataFrame,
-    chip1_count: int,
-    chip3_count: int,
-) -> plt.Figure:
+def create_forward_cnp_boxplot_comparison(box_stats: pd.DataFrame) -> plt.Figure:
     """
     Create a boxplot comparing Forward CNP Shift across all 3 chips for each gate voltage.
     Each gate voltage has 3 boxes (one per chip) with different colors.
 
     Args:
-        *all_props: All DataFrames in order: CHIP1 samples, then CHIP3 samples, then CHIP4 samples.
-        chip1_count: Number of CHIP1 samples.
-        chip3_count: Number of CHIP3 samples.
+        box_stats: Box statistics of the CNP shifts per chip and VG (forward_cnp_box_stats).
 
     Returns:
         matplotlib Figure object with the comparison boxplot.
     """
-    # Split the flat list into chip groups
-    chip1_props = all_props[:chip1_count]
-    chip3_props = all_props[chip1_count : chip1_count + chip3_count]
-    chip4_props = all_props[chip1_count + chip3_count :]
-
-    # Concatenate all samples for each chip
-    chip1_data = pd.concat(chip1_props, ignore_index=True)
-    chip3_data = pd.concat(chip3_props, ignore_index=True)
-    chip4_data = pd.concat(chip4_props, ignore_index=True)
-
-    # Filter out outliers where delta exceeds threshold
-    chip1_data = chip1_data[
-        chip1_data["delta_CNP_gate_voltage_forward"].abs()
-        <= DELTA_CNP_OUTLIER_THRESHOLD
-    ]
-    chip3_data = chip3_data[
-        chip3_data["delta_CNP_gate_voltage_forward"].abs()
-        <= DELTA_CNP_OUTLIER_THRESHOLD
-    ]
-    chip4_data = chip4_data[
-        chip4_data["delta_CNP_gate_voltage_forward"].abs()
-        <= DELTA_CNP_OUTLIER_THRESHOLD
-    ]
-
     # Get unique VG values across all chips
-    all_vg = sorted(
-        set(chip1_data["VG"].dropna())
-        | set(chip3_data["VG"].dropna())
-        | set(chip4_data["VG"].dropna())
-    )
+    all_vg = sorted(box_stats["VG"].unique())
 
     # Tick marks to display
     tick_vg = [-40, -20, 0, 20, 40]
@@ -135,55 +99,33 @@ def create_forward_cnp_boxplot_comparison(
     box_spacing = 0.3  # Space between box centers within a VG group
     group_spacing = 1.5  # Space between VG groups
 
-    positions_chip1 = []
-    positions_chip3 = []
-    positions_chip4 = []
-
     # Prepare data and positions for each VG
-    data_chip1 = []
-    data_chip3 = []
-    data_chip4 = []
-
-    for i, vg in enumerate(all_vg):
-        base_pos = i * group_spacing  # Base position for this VG group
-
-        # CHIP1
-        chip1_vg_data = chip1_data[chip1_data["VG"] == vg][
-            "delta_CNP_gate_voltage_forward"
-        ].dropna()
-        data_chip1.append(chip1_vg_data.values if len(chip1_vg_data) > 0 else [])
-        positions_chip1.append(base_pos - box_spacing)
-
-        # CHIP3
-        chip3_vg_data = chip3_data[chip3_data["VG"] == vg][
-            "delta_CNP_gate_voltage_forward"
-        ].dropna()
-        data_chip3.append(chip3_vg_data.values if len(chip3_vg_data) > 0 else [])
-        positions_chip3.append(base_pos)
-
-        # CHIP4
-        chip4_vg_data = chip4_data[chip4_data["VG"] == vg][
-            "delta_CNP_gate_voltage_forward"
-        ].dropna()
-        data_chip4.append(chip4_vg_data.values if len(chip4_vg_data) > 0 else [])
-        positions_chip4.append(base_pos + box_spacing)
+    data_chip1 = chip_boxes(box_stats, "CHIP1", all_vg)
+    data_chip3 = chip_boxes(box_stats, "CHIP3", all_vg)
+    data_chip4 = chip_boxes(box_stats, "CHIP4", all_vg)
+
+    # Base position of each VG group
+    base_positions = [i * group_spacing for i in range(len(all_vg))]
+    positions_chip1 = [base_pos - box_spacing for base_pos in base_positions]
+    positions_chip3 = base_positions
+    positions_chip4 = [base_pos + box_spacing for base_pos in base_positions]
 
     # Create boxplots for each chip
-    bp1 = ax.boxplot(
+    bp1 = ax.bxp(
         data_chip1,
         positions=positions_chip1,
         widths=box_width,
         patch_artist=True,
         showfliers=True,
     )
-    bp3 = ax.boxplot(
+    bp3 = ax.bxp(
         data_chip3,
         positions=positions_chip3,
         widths=box_width,
         patch_artist=True,
         showfliers=True,
     )
-    bp4 = ax.boxplot(
+    bp4 = ax.bxp(
         data_chip4,
         positions=positions_chip4,
         widths=box_width,
@@ -0,0 +1,112 @@
+"""
+This is a boilerplate pipeline 'base_processing'
+generated using Kedro 0.19.10
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple, Union
+
+import pandas as pd
+
+from nanolab_processing_base.extras.datasets.properties_table import UNCHANGED, Unchanged
+from nanolab_processing_base.hooks_utils import (
+    PRIMARY_FORMATS,
+    clear_primary_data,
+    merge_props,
+    normalize_key,
+    partition_filepath,
+    primary_data_exists,
+    primary_data_path,
+    remove_partitions,
+    separate_nanolab_dataset,
+)
+from nanolab_processing_base.manifest import build_manifest, diff_manifest, load_manifest
+from nanolab_processing_base.parallel import DEFAULT_EXECUTOR
+
+logger = logging.getLogger(__name__)
+
+
+def read_previous_props(properties_path: Path) -> pd.DataFrame:
+    """Reads the properties table written by a previous run."""
+    # Only empty cells are missing values: text such as 'None' must survive the round trip
+    return pd.read_csv(properties_path, keep_default_na=False, na_values=[""])
+
+
+def ingest_project(
+    experiments: Dict[str, Callable],
+    ingestion: Dict[str, Any],
+    procedures: Dict[str, Any],
+    project: str,
+    raw_config: Dict[str, Any],
+) -> Tuple[Union[pd.DataFrame, Unchanged], Dict[str, Any], Dict[str, Dict]]:
+    """
+    Parses the new or changed raw files of a project into its properties table and
+    per-experiment data.
+
+    A manifest of the raw files (size, modification time and content hash) is kept in
+    data/03_primary/manifest_{project}.json (the manifest_{project} output), and only files that were added or changed
+    since the last run are parsed. Data of deleted (or no longer parseable) files is
+    removed from the primary layer.
+
+    Args:
+        experiments: Loaders of the raw project_* dataset, keyed by data_key.
+        ingestion: The 'ingestion' parameters (pool settings and primary_format).
+        procedures: The 'procedures' parameters, the schemas of the raw files.
+        project: Name of the raw dataset, e.g. "project_CHIP1A".
+        raw_config: Catalog entry of the raw dataset, used to locate its files.
+
+    Returns:
+        The complete properties table, or UNCHANGED when no raw file was added, changed or
+        removed (the table on disk is then kept as it is), and the data of the parsed
+        experiments only (saving it leaves the other experiments in place), and the
+        manifest of the raw files, saved after them.
+    """
+    primary_format = ingestion.get("primary_format", "csv")
+
+    # Define paths for the datasets
+    properties_path = Path(f"data/03_primary/properties_{project}.csv")
+    data_path = primary_data_path(project, primary_format)
+    manifest_path = Path(f"data/03_primary/manifest_{project}.json")
+
+    # Without previous outputs in the configured format every file has to be parsed again
+    outputs_exist = properties_path.exists() and primary_data_exists(data_path, primary_format)
+    previous_manifest = load_manifest(str(manifest_path)) if outputs_exist else {}
+    if not outputs_exist:
+        # e.g. data left in another format
+        clear_primary_data(project)
+
+    experiments = {normalize_key(key): loader for key, loader in experiments.items()}
+    paths = {key: partition_filepath(raw_config, key) for key in experiments}
+    manifest = build_manifest(paths, previous_manifest)
+    changed, removed = diff_manifest(previous_manifest, manifest)
+
+    if not changed and not removed:
+        logger.info(f"{project} is up to date")
+        return UNCHANGED, {}, manifest
+
+    logger.info(f"Processing dataset: {project} ({len(changed)} new or changed, {len(removed)} removed files)")
+    new_props, indexed_data = separate_nanolab_dataset(
+        {key: experiments[key] for key in changed},
+        max_workers=ingestion.get("max_workers", 1),
+        executor=ingestion.get("executor", DEFAULT_EXECUTOR),
+        max_in_flight=ingestion.get("max_in_flight"),
+        procedures=procedures,
+    )
+    # Files that failed to parse are left out of the outputs and of the manifest,
+    # so they are retried on the next run
+    failed = [key for key in changed if key not in indexed_data]
+
+    previous_props = read_previous_props(properties_path) if previous_manifest else None
+    consolidated_props = merge_props(previous_props, new_props, changed + removed)
+
+    if primary_format == "store":
+        # The store drops the experiments saved as None (saving it rewrites the whole file)
+        indexed_data = {**indexed_data, **dict.fromkeys(removed + failed)}
+    else:
+        remove_partitions(data_path, removed + failed, PRIMARY_FORMATS[primary_format][1])
+
+    for key in failed:
+        manifest.pop(key)
+
+    return consolidated_props, indexed_data, manifest
@@ -0,0 +1,39 @@
+"""
+This is a boilerplate pipeline 'base_processing'
+generated using Kedro 0.19.10
+"""
+
+from functools import partial
+
+from kedro.pipeline import Pipeline, node, pipeline
+
+from nanolab_processing_base.projects import list_projects
+from nanolab_processing_base.stress_events import index_stress_events
+
+from .nodes import ingest_project
+
+
+def create_pipeline(**kwargs) -> Pipeline:
+    # One ingestion node per raw project_* dataset of the catalog, and its stress-event index
+    nodes = []
+    for project, raw_config in list_projects().items():
+        nodes.append(
+            node(
+                func=partial(ingest_project, project=project, raw_config=raw_config),
+                inputs=[project, "params:ingestion", "params:procedures"],
+                outputs=[f"properties_{project}", f"data_{project}", f"manifest_{project}"],
+                name=f"ingest_{project}",
+                tags=["ingestion", f"ingestion_{project}"],
+            )
+        )
+        nodes.append(
+            node(
+                func=index_stress_events,
+                inputs=f"properties_{project}",
+                outputs=f"stress_events_{project}",
+                name=f"index_stress_events_{project}",
+                tags=["ingestion", f"ingestion_{project}"],
+            )
+        )
+
+    return pipeline(nodes)
@@ -0,0 +1,70 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+from kedro.framework.project import settings
+from kedro.utils import _find_kedro_project
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def project_path() -> Path:
+    """
+    Root folder of the Kedro project: the closest folder holding its pyproject.toml,
+    from the current working directory up, as the Kedro CLI finds it. Falls back to the
+    current working directory.
+    """
+    return _find_kedro_project(Path.cwd()) or Path.cwd()
+
+
+def load_catalog_config(conf_source: Optional[str] = None, env: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Loads the catalog configuration of the project, without creating a KedroSession.
+
+    The pipelines are generated from this configuration when they are registered,
+    before the environment of a run is known: they always follow the catalog of the
+    default run environment (``env=None``), whatever ``kedro run --env`` is given.
+
+    Args:
+        conf_source (str): Configuration folder. Defaults to the project's CONF_SOURCE,
+            relative to the project root (see ``project_path``).
+        env (str): Configuration environment. Defaults to the loader's default run environment.
+
+    Returns:
+        Dict[str, Any]: The catalog entries, keyed by dataset name.
+    """
+    return _load_catalog_config(str(project_path() / (conf_source or settings.CONF_SOURCE)), env)
+
+
+@lru_cache(maxsize=None)
+def _load_catalog_config(conf_source: str, env: Optional[str]) -> Dict[str, Any]:
+    # Cached by absolute configuration folder, so that other projects are not mixed up
+    if not Path(conf_source).exists():
+        logger.warning(f"Configuration folder '{conf_source}' not found. No catalog entries loaded.")
+        return {}
+    config_loader = settings.CONFIG_LOADER_CLASS(conf_source=conf_source, env=env, **settings.CONFIG_LOADER_ARGS)
+    return config_loader["catalog"]
+
+
+def list_projects(conf_source: Optional[str] = None, env: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Lists the raw ``project_*`` datasets defined in the catalog.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The catalog entry of every project, keyed by dataset
+        name (e.g. "project_CHIP1A"), in the order of the catalog.
+    """
+    catalog = load_catalog_config(conf_source, env)
+    return {name: config for name, config in catalog.items() if name.startswith("project_")}
+
+
+def project_chip_sample(project: str) -> Tuple[str, str]:
+    """
+    Splits the name of a project dataset into its chip and sample,
+    e.g. "project_CHIP1A" into ("CHIP1", "A").
+    """
+    name = project.removeprefix("project_")
+    return name[:-1], name[-1:]
@@ -0,0 +1,312 @@
+from functools import partial
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+import glob
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import sys
+
+import matplotlib
+
+matplotlib.use("Agg")  # Use non-interactive backend, in the rendering workers as well
+import matplotlib.pyplot as plt
+import nanoplot as nplt
+from matplotlib.backends.backend_pdf import PdfPages
+from kedro.pipeline import node
+from kedro.pipeline.node import Node
+
+from nanolab_processing_base.parallel import DEFAULT_EXECUTOR, imap_ordered
+
+# Workers import this module to unpickle render_figure, so they get the style too
+nplt.apply()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every cached figure (e.g. after changing render_figure)
+RENDER_CACHE_VERSION = 1
+
+
+class ReportFigure(NamedTuple):
+    """
+    A figure of a reporting pipeline.
+
+    Attributes:
+        function: Plotting function returning the figure, with its parameters bound
+            (e.g. with functools.partial). Must be picklable to render in processes.
+        inputs: Datasets passed to the function, in order.
+        output: Dataset the file of the figure is saved to (a FigureFileDataSet).
+    """
+
+    function: Callable[..., plt.Figure]
+    inputs: List[str]
+    output: str
+
+
+class ReportPage(NamedTuple):
+    """
+    A page of a report bundle (see report_bundle).
+
+    Attributes:
+        function: Plotting function returning the figure of the page, with its
+            parameters bound. Must be picklable to render in processes.
+        inputs: Datasets passed to the function, in order.
+        title: Title drawn at the top of the page, e.g. the name of the sample.
+    """
+
+    function: Callable[..., plt.Figure]
+    inputs: List[str]
+    title: Optional[str] = None
+
+
+def draw_pages(*inputs: Any, pages: List[Tuple[Callable[..., plt.Figure], int, Optional[str]]]) -> Iterator[plt.Figure]:
+    """
+    Draws the pages of a bundle one at a time, so that a single figure is open at once.
+
+    Args:
+        *inputs: The inputs of all the pages, in the order of ``pages``.
+        pages: The plotting function, number of inputs and title of each page.
+
+    Yields:
+        plt.Figure: The figure of each page.
+    """
+    position = 0
+    for function, n_inputs, title in pages:
+        fig = function(*inputs[position:position + n_inputs])
+        position += n_inputs
+        if title is not None:
+            fig.suptitle(title)
+        yield fig
+
+
+def report_bundle(pages: List[ReportPage], output: str) -> ReportFigure:
+    """
+    A figure whose file is a multi-page PDF, with one page per item of ``pages``.
+
+    The pages are drawn one after the other and streamed through a single PDF writer,
+    in one job of the rendering pool, which saves the per-figure overhead of many
+    small files.
+
+    Args:
+        pages: The pages, in order.
+        output: Dataset the PDF is saved to (a FigureFileDataSet).
+    """
+    return ReportFigure(
+        function=partial(draw_pages, pages=[(page.function, len(page.inputs), page.title) for page in pages]),
+        inputs=[dataset for page in pages for dataset in page.inputs],
+        output=output,
+    )
+
+
+def render_figure(job: Tuple[Callable[..., Any], Tuple[Any, ...]]) -> bytes:
+    """
+    Draws a figure and returns the content of its file.
+
+    The figure is saved with the savefig defaults of the process (as MatplotlibWriter
+    does), then closed, so that a worker does not accumulate open figures. A function
+    yielding several figures (see draw_pages) gives a multi-page PDF instead, written
+    without a creation date so that identical pages give identical files.
+
+    Args:
+        job: The plotting function and the arguments to call it with.
+
+    Returns:
+        bytes: The content of the figure file.
+    """
+    function, args = job
+    result = function(*args)
+    buffer = BytesIO()
+    if isinstance(result, plt.Figure):
+        try:
+            result.savefig(buffer)
+        finally:
+            plt.close(result)
+        return buffer.getvalue()
+
+    with PdfPages(buffer, metadata={"CreationDate": None}) as pdf:
+        for fig in result:
+            try:
+                pdf.savefig(fig)
+            finally:
+                plt.close(fig)
+    return buffer.getvalue()
+
+
+class RenderCache:
+    def __init__(self, directory: str):
+        """
+        Last rendered file of each figure, with the key it was rendered for, stored as
+        ``<directory>/<output>.<key>``. Older entries of a figure are removed when a new
+        one is stored, so the folder holds at most one file per figure.
+
+        Args:
+            directory (str): Folder holding the entries.
+        """
+        self.directory = directory
+
+    def _path(self, output: str, key: str) -> str:
+        return os.path.join(self.directory, f"{output}.{key}")
+
+    def get(self, output: str, key: str) -> Optional[bytes]:
+        """
+        Returns the file of ``output`` rendered for ``key``, or None on a miss.
+        """
+        try:
+            with open(self._path(output, key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, output: str, key: str, content: bytes) -> None:
+        """
+        Stores the file of ``output`` rendered for ``key``, replacing the previous one.
+        Errors are logged, not raised.
+        """
+        path = self._path(output, key)
+        temporary_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary_path, "wb") as f:
+                f.write(content)
+            os.replace(temporary_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write render cache entry {path}: {e}")
+            return
+        for previous_path in glob.glob(os.path.join(glob.escape(self.directory), glob.escape(output) + ".*")):
+            if previous_path != path:
+                try:
+                    os.remove(previous_path)
+                except OSError:
+                    pass
+
+
+def fingerprint(value: Any) -> Optional[str]:
+    """
+    Hash of the content of a node input or parameter, or None when it cannot be
+    hashed. Lazily loaded partitions (dictionaries of loaders) cannot: their content
+    is only known once loaded.
+    """
+    if isinstance(value, dict) and any(callable(item) for item in value.values()):
+        return None
+    try:
+        content = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def plotting_modules(value: Any) -> Set[str]:
+    """
+    Names of the modules defining the plotting functions in ``value``: a function, a
+    functools.partial (including the functions bound to it, e.g. the pages of a
+    bundle) or a list, tuple or dictionary of them.
+    """
+    if isinstance(value, partial):
+        return plotting_modules(value.func) | plotting_modules(value.args) | plotting_modules(value.keywords)
+    if isinstance(value, (list, tuple)):
+        return set().union(*map(plotting_modules, value))
+    if isinstance(value, dict):
+        return set().union(*map(plotting_modules, value.values()))
+    if inspect.isfunction(value):
+        return {value.__module__}
+    return set()
+
+
+def figure_key(function: Callable[..., Any], args: Tuple[Any, ...]) -> Optional[str]:
+    """
+    Key of the rendering of a figure: a hash of its inputs, of the parameters bound to
+    the plotting function, of the source of the modules defining the plotting functions
+    (which includes their helpers) and of the Matplotlib version and style. None when an
+    input cannot be hashed, in which case the figure is always rendered.
+
+    Args:
+        function: Plotting function, possibly a functools.partial.
+        args: Inputs passed to the function.
+    """
+    modules = sorted(plotting_modules(function))
+    parameters = ()
+    if isinstance(function, partial):
+        function, parameters = function.func, (function.args, function.keywords)
+    fingerprints = [fingerprint(value) for value in [parameters, *args]]
+    if None in fingerprints:
+        return None
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{RENDER_CACHE_VERSION}:{matplotlib.__version__}:{function.__qualname__}".encode())
+    for module in modules:
+        digest.update(inspect.getsource(sys.modules[module]).encode())
+    digest.update(repr(sorted(plt.rcParams.items())).encode())
+    for value in fingerprints:
+        digest.update(value.encode())
+    return digest.hexdigest()
+
+
+def render_report(parameters: Dict, *inputs: Any, figures: List[ReportFigure]) -> List[bytes]:
+    """
+    Renders the figures of a report, optionally in a pool of worker processes.
+
+    Each worker draws with its own Agg backend and nanoplot style and sends back only
+    the finished file content, which the FigureFileDataSet outputs write. With a
+    'cache_dir', figures whose inputs, parameters and plotting code did not change since
+    their last rendering are not drawn again: their previous file is returned, and the
+    FigureFileDataSet leaves the existing file untouched.
+
+    Args:
+        parameters: The 'reporting' parameters (max_workers, executor, cache_dir).
+        *inputs: The inputs of all the figures, in the order of ``figures``.
+        figures: The figures to render.
+
+    Returns:
+        List[bytes]: The content of the file of each figure, in the order of ``figures``.
+    """
+    cache_dir = parameters.get("cache_dir")
+    cache = RenderCache(cache_dir) if cache_dir else None
+
+    contents: List[Optional[bytes]] = []
+    keys: List[Optional[str]] = []
+    jobs = []
+    position = 0
+    for figure in figures:
+        args = inputs[position:position + len(figure.inputs)]
+        position += len(figure.inputs)
+        key = figure_key(figure.function, args) if cache else None
+        content = cache.get(figure.output, key) if key else None
+        if content is None:
+            jobs.append((len(contents), (figure.function, args)))
+        contents.append(content)
+        keys.append(key)
+
+    for index, content, error in imap_ordered(
+        render_figure,
+        jobs,
+        max_workers=parameters.get("max_workers", 1),
+        executor=parameters.get("executor", DEFAULT_EXECUTOR),
+    ):
+        if error is not None:
+            raise RuntimeError(f"Could not render '{figures[index].output}'") from error
+        contents[index] = content
+        if keys[index]:
+            cache.put(figures[index].output, keys[index], content)
+    logger.info(f"Rendered {len(jobs)} figures, {len(figures) - len(jobs)} unchanged")
+    return contents
+
+
+def report_node(figures: List[ReportFigure], name: str) -> Node:
+    """
+    Creates a single node rendering ``figures`` with render_report, so that they can be
+    drawn in parallel. Inputs shared by several figures are loaded once.
+
+    Args:
+        figures: The figures to render.
+        name: Name of the node.
+    """
+    return node(
+        func=partial(render_report, figures=figures),
+        inputs=["params:reporting", *[dataset for figure in figures for dataset in figure.inputs]],
+        outputs=[figure.output for figure in figures],
+        name=name,
+    )
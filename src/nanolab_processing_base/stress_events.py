@@ -0,0 +1,81 @@
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from nanolab_processing_base.hooks_utils import normalize_key
+
+STRESS_EVENT_COLUMNS = ["stress_key", "previous_key", "next_key"]
+
+
+def index_stress_events(props: pd.DataFrame) -> pd.DataFrame:
+    """
+    Builds the stress-event index of a project: one row per Stress experiment, in
+    Start time order, with the data_keys of the experiments just before and just
+    after it (the VVg measured before and after the stress).
+
+    Args:
+        props (pd.DataFrame): Properties of the project ('data_key', 'Start time' and
+            'Procedure type' columns).
+
+    Returns:
+        pd.DataFrame: Columns 'stress_key', 'previous_key' and 'next_key'. The
+        neighbour keys are missing for a stress at either end of the project.
+    """
+    ordered = props.sort_values(by="Start time")
+    keys = ordered["data_key"].map(normalize_key)
+    is_stress = (ordered["Procedure type"] == "Stress").to_numpy()
+    events = pd.DataFrame(
+        {
+            "stress_key": keys,
+            "previous_key": keys.shift(1),
+            "next_key": keys.shift(-1),
+        }
+    )
+    return events[is_stress].reset_index(drop=True)
+
+
+def positions_of(props: pd.DataFrame, keys: Sequence[str]) -> np.ndarray:
+    """
+    Positions (for ``iloc``) of the rows of ``props`` with the given data_keys.
+    Missing keys (NaN) and keys not found in ``props`` are skipped.
+    """
+    keys = pd.Series(keys, dtype=object).dropna()
+    positions = pd.Index(props["data_key"].map(normalize_key)).get_indexer(keys)
+    return positions[positions >= 0]
+
+
+def previous_positions(props: pd.DataFrame, stress_events: pd.DataFrame) -> np.ndarray:
+    """
+    Positions of the experiments just before each stress (the VVg after annealing).
+    """
+    return positions_of(props, stress_events["previous_key"])
+
+
+def next_positions(props: pd.DataFrame, stress_events: pd.DataFrame) -> np.ndarray:
+    """
+    Positions of the experiments just after each stress.
+    """
+    return positions_of(props, stress_events["next_key"])
+
+
+def add_stress_deltas(props: pd.DataFrame, stress_events: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """
+    Adds a 'delta_<column>' column for each of ``columns``: on the experiment following
+    a stress, its value minus the value of the experiment preceding that stress. Other
+    rows get NaN. All deltas are computed in one vectorized pass.
+    """
+    complete = stress_events.dropna(subset=["previous_key", "next_key"])
+    index = pd.Index(props["data_key"].map(normalize_key))
+    after = index.get_indexer(complete["next_key"])
+    before = index.get_indexer(complete["previous_key"])
+    found = (after >= 0) & (before >= 0)
+    after, before = after[found], before[found]
+
+    deltas = {}
+    for column in columns:
+        values = props[column].to_numpy(dtype=float)
+        delta = np.full(len(props), np.nan)
+        delta[after] = values[after] - values[before]
+        deltas[f"delta_{column}"] = delta
+    return props.assign(**deltas)
@@ -0,0 +1,104 @@
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# A range of rows [start, stop)
+Range = Tuple[int, int]
+
+
+def sweep_ranges(vg: np.ndarray) -> Tuple[List[Range], List[Range]]:
+    """
+    Splits a gate sweep at the turning points of Vg (V), found in a single pass.
+
+    A branch is a run of consecutive rising (forward) or falling (backward) steps and
+    includes the rows at both of its ends, so the turning point belongs to the branches
+    on both sides. Flat or NaN steps end a branch. Multi-loop sweeps give several
+    ranges per direction.
+
+    Args:
+        vg (np.ndarray): Gate voltages of the sweep, in measurement order.
+
+    Returns:
+        Tuple[List[Range], List[Range]]: The [start, stop) row ranges of the forward
+        branches and of the backward branches, in measurement order.
+    """
+    steps = np.sign(np.diff(vg))
+    if len(steps) == 0:
+        return [], []
+    # Steps where the direction changes start a new run
+    starts = np.flatnonzero(np.r_[True, steps[1:] != steps[:-1]])
+    stops = np.r_[starts[1:], len(steps)]
+
+    forward = []
+    backward = []
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        direction = steps[start]
+        if direction > 0:
+            forward.append((start, stop + 1))
+        elif direction < 0:
+            backward.append((start, stop + 1))
+    return forward, backward
+
+
+def _branch(values: np.ndarray, ranges: List[Range], reverse: bool) -> np.ndarray:
+    """
+    Rows of ``values`` in ``ranges``. A single range gives a view, without copying.
+    """
+    if len(ranges) == 1:
+        start, stop = ranges[0]
+        return values[start:stop][::-1] if reverse else values[start:stop]
+    if not ranges:
+        return values[:0]
+    return np.concatenate([values[start:stop] for start, stop in ranges])
+
+
+def forward_sweep(vg: np.ndarray, vds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Forward (rising Vg) rows of a sweep, in measurement order.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Vg and VDS of the forward branches, as views of
+        the input arrays when the sweep has a single forward branch.
+    """
+    forward, _ = sweep_ranges(vg)
+    return _branch(vg, forward, reverse=False), _branch(vds, forward, reverse=False)
+
+
+def backward_sweep(vg: np.ndarray, vds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Backward (falling Vg) rows of a sweep, by increasing Vg.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Vg and VDS of the backward branches, as reversed
+        views of the input arrays when the sweep has a single backward branch.
+    """
+    _, backward = sweep_ranges(vg)
+    if len(backward) <= 1:
+        return _branch(vg, backward, reverse=True), _branch(vds, backward, reverse=True)
+    vg, vds = _branch(vg, backward, reverse=False), _branch(vds, backward, reverse=False)
+    order = np.argsort(vg, kind="stable")
+    return vg[order], vds[order]
+
+
+def _rows(ranges: List[Range]) -> np.ndarray:
+    """Row positions covered by ``ranges``."""
+    if not ranges:
+        return np.empty(0, dtype=int)
+    return np.concatenate([np.arange(start, stop) for start, stop in ranges])
+
+
+def get_forward(df: pd.DataFrame) -> pd.DataFrame:
+    """Extract only the forward sweep from a VVg experiment."""
+    forward, _ = sweep_ranges(df["Vg (V)"].to_numpy(dtype=float))
+    if len(forward) == 1:
+        return df.iloc[forward[0][0]:forward[0][1]]
+    return df.iloc[_rows(forward)]
+
+
+def get_backward(df: pd.DataFrame) -> pd.DataFrame:
+    """Extract only the backward sweep from a VVg experiment, sorted by Vg (V)."""
+    _, backward = sweep_ranges(df["Vg (V)"].to_numpy(dtype=float))
+    if len(backward) == 1:
+        return df.iloc[backward[0][0]:backward[0][1]].iloc[::-1]
+    return df.iloc[_rows(backward)].sort_values(by="Vg (V)", kind="stable")
@@ -7,3 +7,277 @@ Kedro recommends using `pytest` framework, more info about it can be found
 in the official documentation:
 https://docs.pytest.org/en/latest/getting-started.html
 """
+
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nanolab_processing_base.pipelines.CNP_calculations import nodes
+from nanolab_processing_base.pipelines.CNP_calculations.nodes import (
+    CNP_fingerprint,
+    after_stress_CNP_calculations,
+    consolidate_properties,
+    get_batched_incremental_CNPs,
+    get_CNP,
+    get_CNPs,
+    get_incremental_partitioned_CNPs,
+    get_partitioned_CNPs,
+)
+from nanolab_processing_base.extras.datasets.properties_store import PropertiesStoreDataSet, sample_filters
+from nanolab_processing_base.pipelines.CNP_calculations.estimators import fit_sweeps
+from nanolab_processing_base.stress_events import index_stress_events
+from nanolab_processing_base.sweeps import get_backward, get_forward, sweep_ranges
+
+def make_vvg(n_points: int, cnp: float, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    vg = np.linspace(-5, 5, n_points)
+    vg = np.concatenate([vg, vg[::-1]])
+    vds = 0.5 - 0.02 * (vg - cnp) ** 2 + rng.normal(0, 1e-3, len(vg))
+    return pd.DataFrame({"Vg (V)": vg, "VDS (V)": vds})
+
+
+@pytest.mark.parametrize("get_sweep", [get_forward, get_backward])
+def test_batched_CNPs_match_per_sweep_fit(get_sweep):
+    sweeps = [get_sweep(make_vvg(n_points, cnp, seed)) for seed, (n_points, cnp) in enumerate(
+        [(101, 0.3), (51, -1.2), (200, 2.0), (9, 0.0)]
+    )]
+    gate_voltages, drain_voltages = get_CNPs(sweeps)
+    expected = np.array([get_CNP(sweep) for sweep in sweeps])
+    np.testing.assert_allclose(gate_voltages, expected[:, 0], rtol=1e-6, atol=1e-9)
+    np.testing.assert_allclose(drain_voltages, expected[:, 1], rtol=1e-6, atol=1e-9)
+
+
+def test_batched_CNPs_are_nan_for_too_short_sweeps():
+    short = pd.DataFrame({"Vg (V)": [0.0, 0.1], "VDS (V)": [0.5, 0.4]})
+    gate_voltages, drain_voltages = get_CNPs([short, get_forward(make_vvg(21, 0.5))])
+    assert np.isnan(gate_voltages[0]) and np.isnan(drain_voltages[0])
+    assert np.isfinite(gate_voltages[1]) and np.isfinite(drain_voltages[1])
+
+
+def test_grid_keyed_CNPs_match_per_sweep_fit():
+    # Sweeps on two shared grids, one with NaN and one too short for a fit
+    sweeps = [get_forward(make_vvg(n_points, cnp, seed)) for seed, (n_points, cnp) in enumerate(
+        [(101, 0.3), (101, -1.2), (51, 2.0), (101, 0.3), (51, -0.5)]
+    )]
+    sweeps[3] = sweeps[3].assign(**{"VDS (V)": sweeps[3]["VDS (V)"].where(lambda vds: vds < vds.max())})
+    sweeps.append(pd.DataFrame({"Vg (V)": [0.0, 0.1], "VDS (V)": [0.5, 0.4]}))
+    arrays = [(sweep["Vg (V)"].to_numpy(), sweep["VDS (V)"].to_numpy()) for sweep in sweeps]
+
+    # Every grid goes through the fit matrices, however few sweeps share it
+    gate_voltages, drain_voltages = fit_sweeps(arrays, min_group_size=1)
+    expected = np.array([get_CNP(sweep.dropna()) for sweep in sweeps[:-1]])
+    np.testing.assert_allclose(gate_voltages[:-1], expected[:, 0], rtol=1e-6, atol=1e-9)
+    np.testing.assert_allclose(drain_voltages[:-1], expected[:, 1], rtol=1e-6, atol=1e-9)
+    assert np.isnan(gate_voltages[-1]) and np.isnan(drain_voltages[-1])
+
+
+def test_CNPs_on_jittered_grids_match_per_sweep_fit():
+    # Measured Vg never repeats exactly: every sweep is on its own grid
+    rng = np.random.default_rng(0)
+    sweeps = [get_forward(make_vvg(101, cnp, seed)) for seed, cnp in enumerate(rng.uniform(-2, 2, 20))]
+    sweeps = [sweep.assign(**{"Vg (V)": sweep["Vg (V)"] + rng.normal(0, 1e-3, len(sweep))}) for sweep in sweeps]
+    arrays = [(sweep["Vg (V)"].to_numpy(), sweep["VDS (V)"].to_numpy()) for sweep in sweeps]
+
+    gate_voltages, drain_voltages = fit_sweeps(arrays, min_group_size=2)
+    expected = np.array([get_CNP(sweep) for sweep in sweeps])
+    np.testing.assert_allclose(gate_voltages, expected[:, 0], rtol=1e-6, atol=1e-9)
+    np.testing.assert_allclose(drain_voltages, expected[:, 1], rtol=1e-6, atol=1e-9)
+
+
+def test_partitioned_CNPs_leave_other_experiments_and_input_untouched():
+    props = pd.DataFrame(
+        {
+            "data_key": ["2024-11-11\\VVg2024-11-11_1", "2024-11-11/Stress2024-11-11_2"],
+            "Procedure type": ["VVg", "Stress"],
+            "Drain-Source current": [1e-6, 1e-6],
+        }
+    )
+    data = {
+        "2024-11-11/VVg2024-11-11_1": lambda: make_vvg(101, 0.3),
+        "2024-11-11/Stress2024-11-11_2": lambda: pd.DataFrame(),
+    }
+    original = props.copy()
+
+    result = get_partitioned_CNPs(data, props)
+
+    pd.testing.assert_frame_equal(props, original)
+    assert result["data_key"].tolist() == ["2024-11-11/VVg2024-11-11_1", "2024-11-11/Stress2024-11-11_2"]
+    assert result.loc[0, "CNP_gate_voltage_forward"] == pytest.approx(0.3, abs=0.05)
+    assert result.loc[1, ["CNP_gate_voltage_forward", "CNP_drain_resistance_backward"]].isna().all()
+
+
+def test_chunked_CNPs_in_a_process_pool_match_the_serial_fit():
+    keys = [f"2024-11-11/VVg2024-11-11_{i}" for i in range(7)]
+    props = pd.DataFrame({"data_key": keys, "Procedure type": "VVg", "Drain-Source current": 1e-6})
+    # Partials of module-level functions, so that the loaders can be sent to the workers
+    data = {key: partial(make_vvg, 41 + 10 * (i % 3), 0.2 * i - 1.0, i) for i, key in enumerate(keys)}
+    parameters = {"chunk_size": 3, "max_workers": 2, "executor": "process"}
+    serial = get_partitioned_CNPs(data, props)
+    pooled = get_partitioned_CNPs(data, props, parameters)
+    pd.testing.assert_frame_equal(pooled, serial, rtol=1e-12, atol=1e-12)
+
+    # An experiment without a 'Vg (V)' column fails its chunk, and the whole fit
+    failing = {**data, keys[4]: partial(pd.DataFrame, {"t (s)": [0.0]})}
+    with pytest.raises(KeyError):
+        get_partitioned_CNPs(failing, props, parameters)
+
+
+def test_several_estimators_in_one_pass_add_suffixed_columns():
+    props = pd.DataFrame(
+        {
+            "data_key": ["2024-11-11/VVg2024-11-11_1"],
+            "Procedure type": ["VVg"],
+            "Drain-Source current": [1e-6],
+        }
+    )
+    loads = []
+    data = {"2024-11-11/VVg2024-11-11_1": lambda: loads.append(1) or make_vvg(101, 0.3)}
+    estimators = {
+        "parabola": {"type": "parabola"},
+        "wide": {"type": "parabola", "n_points": 16},
+        "weighted": {"type": "weighted_parabola", "width": 0.5},
+        "smoothed": {"type": "smoothed_argmax", "window": 5},
+    }
+
+    result = get_partitioned_CNPs(data, props, {"estimators": estimators})
+
+    assert len(loads) == 1
+    assert result.loc[0, "CNP_gate_voltage_forward"] == get_partitioned_CNPs(data, props).loc[0, "CNP_gate_voltage_forward"]
+    for name in ["wide", "weighted", "smoothed"]:
+        assert result.loc[0, f"CNP_gate_voltage_forward_{name}"] == pytest.approx(0.3, abs=0.2)
+        assert result.loc[0, f"CNP_drain_resistance_backward_{name}"] == pytest.approx(5e5, rel=0.01)
+    with pytest.raises(ValueError, match="Unknown type"):
+        get_partitioned_CNPs(data, props, {"estimators": {"spline": {}}})
+
+
+def test_incremental_CNPs_only_refit_changed_experiments():
+    props = pd.DataFrame(
+        {
+            "data_key": ["2024-11-11/VVg2024-11-11_1", "2024-11-11/VVg2024-11-11_2"],
+            "Procedure type": ["VVg", "VVg"],
+            "Drain-Source current": [1e-6, 1e-6],
+        }
+    )
+    data = {
+        "2024-11-11/VVg2024-11-11_1": lambda: make_vvg(101, 0.3),
+        "2024-11-11/VVg2024-11-11_2": lambda: make_vvg(101, -0.7),
+    }
+    manifest = {key: {"hash": key[-1]} for key in data}
+    first, cache = get_incremental_partitioned_CNPs(data, props, manifest, pd.DataFrame())
+
+    def not_reloaded():
+        raise AssertionError("An unchanged experiment was reloaded")
+
+    data["2024-11-11/VVg2024-11-11_1"] = not_reloaded
+    data["2024-11-11/VVg2024-11-11_2"] = lambda: make_vvg(101, 1.5)
+    manifest["2024-11-11/VVg2024-11-11_2"] = {"hash": "changed"}
+    second, _ = get_incremental_partitioned_CNPs(data, props, manifest, cache)
+
+    assert second.loc[0, "CNP_gate_voltage_forward"] == first.loc[0, "CNP_gate_voltage_forward"]
+    assert second.loc[1, "CNP_gate_voltage_forward"] == pytest.approx(1.5, abs=0.05)
+
+
+def test_CNP_fingerprint_follows_the_estimators_and_the_fitting_code(monkeypatch):
+    fingerprint = CNP_fingerprint("raw file hash")
+    assert CNP_fingerprint("raw file hash") == fingerprint
+    assert CNP_fingerprint(None) is None
+    assert CNP_fingerprint("raw file hash", {"parabola": {"type": "parabola", "n_points": 16}}) != fingerprint
+
+    monkeypatch.setattr(nodes, "fit_source_hash", lambda: "edited estimators")
+    assert CNP_fingerprint("raw file hash") != fingerprint
+
+
+def test_batched_CNPs_match_per_project_nodes():
+    projects = []
+    for cnp, stress_cnp in [(0.3, 0.8), (-0.7, -0.2)]:
+        props = pd.DataFrame(
+            {
+                "data_key": ["2024-11-11/VVg_1", "2024-11-11/Stress_2", "2024-11-11/VVg_3"],
+                "Start time": [1.0, 2.0, 3.0],
+                "Procedure type": ["VVg", "Stress", "VVg"],
+                "VG": [np.nan, 1.0, np.nan],
+                "Drain-Source current": [1e-6, 1e-6, 1e-6],
+            }
+        )
+        data = {
+            "2024-11-11/VVg_1": lambda cnp=cnp: make_vvg(101, cnp),
+            "2024-11-11/Stress_2": lambda: pd.DataFrame(),
+            "2024-11-11/VVg_3": lambda cnp=stress_cnp: make_vvg(101, cnp),
+        }
+        manifest = {key: {"hash": f"{key}{cnp}"} for key in data}
+        projects.append((data, props, manifest, pd.DataFrame(), index_stress_events(props)))
+
+    outputs = get_batched_incremental_CNPs({"chunk_size": 1}, *[value for project in projects for value in project])
+
+    assert len(outputs) == 3 * len(projects)
+    for (data, props, manifest, previous_CNPs, stress_events), start in zip(projects, range(0, len(outputs), 3)):
+        expected_props, expected_cache = get_incremental_partitioned_CNPs(data, props, manifest, previous_CNPs)
+        pd.testing.assert_frame_equal(outputs[start], expected_props)
+        pd.testing.assert_frame_equal(outputs[start + 1], expected_cache)
+        pd.testing.assert_frame_equal(outputs[start + 2], after_stress_CNP_calculations(expected_props, stress_events))
+
+
+def test_after_stress_CNPs_from_stress_event_index():
+    props = pd.DataFrame(
+        {
+            "data_key": [f"2024-11-11/{name}" for name in ["VVg_1", "Stress_2", "VVg_3", "Stress_4", "VVg_5"]],
+            "Start time": [5.0, 4.0, 3.0, 2.0, 1.0],
+            "Procedure type": ["VVg", "Stress", "VVg", "Stress", "VVg"],
+            "VG": [np.nan, 2.0, np.nan, 1.0, np.nan],
+            "CNP_gate_voltage_forward": [0.5, np.nan, 0.3, np.nan, 0.1],
+            "CNP_drain_resistance_forward": [50.0, np.nan, 30.0, np.nan, 10.0],
+            "CNP_gate_voltage_backward": [0.6, np.nan, 0.4, np.nan, 0.2],
+            "CNP_drain_resistance_backward": [60.0, np.nan, 40.0, np.nan, 20.0],
+        }
+    ).iloc[::-1].reset_index(drop=True)
+    stress_events = index_stress_events(props)
+
+    assert stress_events["previous_key"].tolist() == ["2024-11-11/VVg_5", "2024-11-11/VVg_3"]
+
+    result = after_stress_CNP_calculations(props, stress_events)
+
+    assert result["data_key"].str[-5:].tolist() == ["VVg_5", "VVg_3", "VVg_3", "VVg_1"]
+    assert result["delta_CNP_gate_voltage_forward"].tolist()[1:] == pytest.approx([0.2, 0.2, 0.2])
+    assert np.isnan(result["delta_CNP_gate_voltage_forward"].iloc[0])
+    assert result["delta_CNP_drain_resistance_backward"].iloc[-1] == pytest.approx(20.0)
+
+
+def test_properties_store_reads_only_the_requested_samples_and_columns(tmp_path):
+    def project_props(vg: float, procedure: object) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "data_key": ["2024-11-11/VVg_1"],
+                "Start time": ["2024-11-11 22:30:25"],
+                "Procedure type": ["VVg"],
+                "VG": [vg],
+                "Procedure version": [procedure],
+            }
+        )
+
+    props = consolidate_properties(
+        project_props(1.0, "1.0.0"), project_props(2.0, 2), project_props(3.0, np.nan),
+        projects=["project_CHIP1A", "project_CHIP1B", "project_CHIP3A"],
+    )
+    store = PropertiesStoreDataSet(path=str(tmp_path / "store"))
+    store.save(props)
+
+    result = store.load().read(columns=["VG", "chip"], filters=sample_filters({"CHIP1": ["B"], "CHIP3": ["A"]}))
+
+    assert result["VG"].tolist() == [2.0, 3.0]
+    assert result["chip"].tolist() == ["CHIP1", "CHIP3"]
+    assert isinstance(result["chip"].dtype, pd.CategoricalDtype)
+    stored = store.load().read()
+    assert stored["Procedure version"].tolist() == ["1.0.0", "2", None]
+    assert stored["Start time"].dtype == "datetime64[ns]"
+
+
+def test_sweep_ranges_split_multi_loop_sweeps_at_turning_points():
+    up = np.linspace(-1, 1, 5)
+    vg = np.concatenate([up, up[-2::-1], up[1:], up[-2::-1]])
+
+    forward, backward = sweep_ranges(vg)
+
+    assert forward == [(0, 5), (8, 13)]
+    assert backward == [(4, 9), (12, 17)]
@@ -0,0 +1,77 @@
+"""
+This is a boilerplate test file for pipeline 'CNP_shift_statistics'
+generated using Kedro 0.19.11.
+Please add your pipeline tests here.
+
+Kedro recommends using `pytest` framework, more info about it can be found
+in the official documentation:
+https://docs.pytest.org/en/latest/getting-started.html
+"""
+
+import numpy as np
+import pandas as pd
+from matplotlib import cbook
+
+from nanolab_processing_base.extras.datasets.properties_store import PropertiesStoreDataSet
+from nanolab_processing_base.pipelines.CNP_shift_statistics.nodes import (
+    aggregate_CNP_shifts,
+    box_statistics,
+    pooled_values,
+    select_samples,
+)
+
+
+def test_aggregate_CNP_shifts_leaves_out_outliers_but_keeps_their_groups(tmp_path):
+    props = pd.DataFrame(
+        {
+            "chip": pd.Categorical(["CHIP1", "CHIP1", "CHIP1", "CHIP1", "CHIP1", "CHIP3"]),
+            "sample": pd.Categorical(["A", "A", "A", "A", "C", "A"]),
+            "VG": [10.0, 10.0, 10.0, -10.0, 10.0, np.nan],
+            "delta_CNP_gate_voltage_forward": [1.0, 3.0, 100.0, np.nan, 2.0, 5.0],
+        }
+    )
+    store = PropertiesStoreDataSet(path=str(tmp_path / "store"))
+    store.save(props)
+
+    stats = aggregate_CNP_shifts(store.load())
+
+    assert stats[["chip", "sample", "VG", "count"]].astype(object).values.tolist() == [
+        ["CHIP1", "A", -10.0, 0],
+        ["CHIP1", "A", 10.0, 2],
+        ["CHIP1", "C", 10.0, 1],
+    ]
+    assert stats["size_group"].tolist() == ["Size 1 (A,B)", "Size 1 (A,B)", "Size 2 (C,D)"]
+    assert stats["mean"].tolist()[1:] == [2.0, 2.0]
+    assert np.isnan(stats["mean"].iloc[0])
+
+    pooled = pooled_values(select_samples(stats, {"CHIP1": ["A", "C"]}), by=["VG"])
+    assert pooled.index.tolist() == [10.0]
+    assert pooled[10.0].tolist() == [1.0, 3.0, 2.0]
+
+
+def test_box_statistics_match_matplotlib_boxplot_stats():
+    rng = np.random.default_rng(0)
+    groups = [rng.normal(0, 1, 25), np.r_[rng.normal(0, 1, 10), 15.0, -12.0], np.array([2.0, 2.0, 2.0]), np.array([0.5])]
+    stats = pd.DataFrame(
+        {
+            "chip": pd.Categorical(["CHIP1", "CHIP1", "CHIP3", "CHIP3"]),
+            "sample": pd.Categorical(["A", "B", "A", "A"]),
+            "VG": [10.0, 10.0, -10.0, 10.0],
+            "count": [len(values) for values in groups],
+            "values": groups,
+        }
+    )
+
+    boxes = box_statistics(stats, {"CHIP1": ["A", "B"], "CHIP3": ["A"]})
+
+    assert boxes[["chip", "VG", "count"]].astype(object).values.tolist() == [
+        ["CHIP1", 10.0, 37],
+        ["CHIP3", -10.0, 3],
+        ["CHIP3", 10.0, 1],
+    ]
+    pooled = [np.concatenate(groups[:2]), groups[2], groups[3]]
+    for box, expected in zip(boxes.itertuples(), cbook.boxplot_stats(pooled)):
+        for column in ["mean", "med", "q1", "q3", "whislo", "whishi"]:
+            assert np.isclose(getattr(box, column), expected[column])
+        assert box.fliers.tolist() == expected["fliers"].tolist()
+    assert {-12.0, 15.0} <= set(boxes["fliers"].iloc[0].tolist())
@@ -7,3 +7,403 @@ Kedro recommends using `pytest` framework, more info about it can be found
 in the official documentation:
 https://docs.pytest.org/en/latest/getting-started.html
 """
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+from kedro_datasets.partitions import PartitionedDataset
+
+from nanolab_processing_base import manifest as manifest_module
+from nanolab_processing_base.extras.datasets import nanolab_dataframe, nanolab_dataset
+from nanolab_processing_base.extras.datasets.experiment_store import ExperimentStoreDataSet
+from nanolab_processing_base.extras.datasets.manifest_file import ManifestDataSet
+from nanolab_processing_base.extras.datasets.nanolab_dataframe import make_props_data, read_header
+from nanolab_processing_base.extras.datasets.nanolab_dataset import NanoLabDataSet
+from nanolab_processing_base.extras.datasets.parse_cache import CACHE_SUFFIX, ParseCache
+from nanolab_processing_base.extras.datasets.properties_table import UNCHANGED, PropertiesTableDataSet
+from nanolab_processing_base.hooks_utils import (
+    clear_primary_data,
+    load_experiments,
+    merge_props,
+    primary_data_path,
+    primary_dataset,
+    remove_partitions,
+    separate_nanolab_dataset,
+)
+from nanolab_processing_base.manifest import build_manifest, diff_manifest, load_manifest, save_manifest
+from nanolab_processing_base.pipelines import base_processing, CNP_calculations
+from nanolab_processing_base.pipelines.base_processing.nodes import ingest_project
+
+PROCEDURES = {
+    "VVg": {
+        "Parameters": {"Sample": "str", "VG step": "float"},
+        "Metadata": {"Start time": "datetime"},
+        "Data": {"Vg (V)": "float", "VDS (V)": "float"},
+    }
+}
+
+
+def write_raw_file(path, sample="A", n_points=5):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines = [
+        "#Procedure: <laser_setup.procedures.VVg.VVg>",
+        "#Parameters:",
+        f"#\tSample: {sample}",
+        "#\tVG step: 0.1 V",
+        "#Metadata:",
+        "#\tStart time: 1731364225.5",
+        "#Data:",
+        "Vg (V),VDS (V)",
+        *[f"{0.1 * i:.3f},{0.5 - 0.01 * i:.6f}" for i in range(n_points)],
+    ]
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_load_experiments_in_processes_gives_the_serial_results(tmp_path):
+    for i, sample in enumerate(["A", "B"]):
+        write_raw_file(tmp_path / "raw" / "2024-11-29" / f"VVg_{i}.csv", sample=sample, n_points=5 + i)
+    # The loaders are bound methods of NanoLabDataSet, pickled to the workers
+    experiments = PartitionedDataset(
+        path=str(tmp_path / "raw"),
+        dataset={"type": NanoLabDataSet, "procedures": PROCEDURES, "cache_dir": None},
+        filename_suffix=".csv",
+    ).load()
+
+    serial, serial_errors = load_experiments(experiments, max_workers=1)
+    pooled, pooled_errors = load_experiments(experiments, max_workers=2, executor="process")
+    assert serial_errors == pooled_errors == {}
+    assert list(pooled) == list(serial) == ["2024-11-29/VVg_0", "2024-11-29/VVg_1"]
+    for key, (props, data) in serial.items():
+        pd.testing.assert_series_equal(pooled[key][0], props)
+        pd.testing.assert_frame_equal(pooled[key][1], data)
+
+
+def test_manifest_rehashes_only_files_whose_size_or_mtime_changed(tmp_path, monkeypatch):
+    paths = {f"2024-11-29/VVg_{i}": write_raw_file(tmp_path / "raw" / "2024-11-29" / f"VVg_{i}.csv") for i in range(3)}
+    previous = build_manifest(paths)
+    manifest_path = str(tmp_path / "manifest.json")
+    save_manifest(previous, manifest_path)
+    assert load_manifest(manifest_path) == previous
+    assert load_manifest(str(tmp_path / "missing.json")) == {}
+
+    write_raw_file(tmp_path / "raw" / "2024-11-29" / "VVg_1.csv", sample="B")
+    os.remove(paths.pop("2024-11-29/VVg_2"))
+    paths["2024-11-30/VVg_0"] = write_raw_file(tmp_path / "raw" / "2024-11-30" / "VVg_0.csv")
+    hashed = []
+    file_hash = manifest_module.file_hash
+    monkeypatch.setattr(manifest_module, "file_hash", lambda path: hashed.append(path) or file_hash(path))
+
+    manifest = build_manifest(paths, previous)
+    assert sorted(hashed) == sorted([paths["2024-11-29/VVg_1"], paths["2024-11-30/VVg_0"]])
+    assert diff_manifest(previous, manifest) == (["2024-11-29/VVg_1", "2024-11-30/VVg_0"], ["2024-11-29/VVg_2"])
+    assert diff_manifest(manifest, manifest) == ([], [])
+
+
+def test_merge_props_replaces_the_rows_of_changed_and_removed_files():
+    # As read back from the properties CSV: Windows keys and text 'Start time'
+    previous_props = pd.DataFrame(
+        {
+            "data_key": ["2024-11-29\\VVg_0", "2024-11-29\\VVg_1", "2024-11-29\\VVg_2"],
+            "Start time": ["2024-11-29 10:00:00", "2024-11-29 11:00:00", "2024-11-29 12:00:00"],
+            "Information": ["None", "kept", "removed"],
+        }
+    )
+    new_props = pd.DataFrame(
+        {
+            "data_key": ["2024-11-29/VVg_1", "2024-11-29/VVg_3"],
+            "Start time": pd.to_datetime(["2024-11-29 13:00:00", "2024-11-29 09:00:00"]),
+            "Information": ["changed", "new"],
+        }
+    )
+
+    merged = merge_props(previous_props, new_props, ["2024-11-29/VVg_1", "2024-11-29/VVg_2"])
+    assert merged["data_key"].tolist() == ["2024-11-29/VVg_3", "2024-11-29/VVg_0", "2024-11-29/VVg_1"]
+    assert merged["Information"].tolist() == ["new", "None", "changed"]
+    pd.testing.assert_frame_equal(merge_props(None, new_props, []), new_props)
+
+
+def test_remove_partitions_deletes_only_the_given_partitions(tmp_path):
+    for name in ["VVg_0", "VVg_1"]:
+        write_raw_file(tmp_path / "data" / "2024-11-29" / f"{name}.csv")
+    remove_partitions(str(tmp_path / "data"), ["2024-11-29/VVg_1", "2024-11-29/VVg_9"], ".csv")
+    assert os.listdir(tmp_path / "data" / "2024-11-29") == ["VVg_0.csv"]
+
+
+def test_clear_primary_data_removes_only_the_primary_data_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data_path = tmp_path / primary_data_path("project_T")
+    store_path = tmp_path / primary_data_path("project_T", "store")
+    files = [
+        data_path / "2024-11-29" / "VVg_1.csv",
+        data_path / "2024-11-29" / "VVg_2.parquet",
+        data_path / "2024-11-30" / "VVg_1.feather",
+        data_path / "notes.txt",
+        store_path,
+        tmp_path / f"{store_path}.index.json",
+    ]
+    for path in files:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("")
+
+    clear_primary_data("project_T")
+    assert sorted(path.name for path in tmp_path.rglob("*") if path.is_file()) == ["notes.txt"]
+    assert sorted(os.listdir(data_path)) == ["notes.txt"]
+
+
+@pytest.mark.parametrize("primary_format", ["csv", "parquet", "feather", "store"])
+def test_primary_dataset_reads_back_the_experiments_and_selects_columns(tmp_path, primary_format):
+    data = {
+        "2024-11-29/VVg_0": pd.DataFrame({"Vg (V)": [0.0, 0.1], "VDS (V)": [0.5, 0.4], "t (s)": [0.0, 0.5]}),
+        "2024-11-29/VVg_1": pd.DataFrame({"Vg (V)": [0.2], "VDS (V)": [0.3], "t (s)": [1.0]}),
+    }
+    path = str(tmp_path / "data_project_T")
+    primary_dataset(path, primary_format).save(data)
+
+    loaded = primary_dataset(path, primary_format).load()
+    assert sorted(loaded) == sorted(data)
+    for key, frame in data.items():
+        pd.testing.assert_frame_equal(loaded[key](), frame)
+    sweeps = primary_dataset(path, primary_format, columns=["Vg (V)", "VDS (V)"]).load()
+    assert sweeps["2024-11-29/VVg_0"]().columns.tolist() == ["Vg (V)", "VDS (V)"]
+
+
+def test_experiment_store_keeps_the_stored_experiments_it_is_not_given(tmp_path):
+    store = ExperimentStoreDataSet(filepath=str(tmp_path / "data_project_T.parquet"))
+    first = pd.DataFrame({"Vg (V)": [0.0, 0.1], "VDS (V)": [0.5, 0.4]})
+    second = pd.DataFrame({"Vg (V)": [0.2], "VDS (V)": [0.3]})
+    store.save({"2024-11-29/VVg_0": first, "2024-11-29/VVg_1": lambda: second})
+    store.save({"2024-11-29/VVg_1": None, "2024-11-30/VVg_0": second, "2024-11-30/VVg_1": second.iloc[:0]})
+
+    loaded = store.load()
+    assert sorted(loaded) == ["2024-11-29/VVg_0", "2024-11-30/VVg_0", "2024-11-30/VVg_1"]
+    pd.testing.assert_frame_equal(loaded["2024-11-29/VVg_0"](), first)
+    pd.testing.assert_frame_equal(loaded["2024-11-30/VVg_0"](), second)
+    assert loaded["2024-11-30/VVg_1"]().empty
+    assert sorted(os.listdir(tmp_path)) == ["data_project_T.parquet", "data_project_T.parquet.index.json"]
+
+
+def test_experiment_store_promotes_a_column_stored_with_different_types(tmp_path):
+    store = ExperimentStoreDataSet(filepath=str(tmp_path / "data_project_T.parquet"))
+    store.save({"2024-11-29/It_0": pd.DataFrame({"t (s)": [0, 1], "I (A)": [1e-6, 2e-6]})})
+    store.save({"2024-11-29/It_1": pd.DataFrame({"t (s)": [0.5, 1.5], "I (A)": [3e-6, 4e-6]})})
+
+    loaded = store.load()
+    assert loaded["2024-11-29/It_0"]()["t (s)"].tolist() == [0.0, 1.0]
+    assert loaded["2024-11-29/It_1"]()["t (s)"].tolist() == [0.5, 1.5]
+
+
+def test_experiment_store_reads_back_only_the_columns_of_each_experiment(tmp_path):
+    vvg = pd.DataFrame({"Vg (V)": [0.0, 0.1], "VDS (V)": [0.5, 0.4]})
+    it = pd.DataFrame({"t (s)": [0.0, 0.5], "I (A)": [1e-6, 2e-6]})
+    path = str(tmp_path / "data_project_T.parquet")
+    ExperimentStoreDataSet(filepath=path).save({"2024-11-29/VVg_0": vvg, "2024-11-29/It_1": it})
+
+    loaded = ExperimentStoreDataSet(filepath=path).load()
+    pd.testing.assert_frame_equal(loaded["2024-11-29/VVg_0"](), vvg)
+    pd.testing.assert_frame_equal(loaded["2024-11-29/It_1"](), it)
+    sweeps = ExperimentStoreDataSet(filepath=path, load_args={"columns": ["Vg (V)", "t (s)"]}).load()
+    assert sweeps["2024-11-29/VVg_0"]().columns.tolist() == ["Vg (V)"]
+    assert sweeps["2024-11-29/It_1"]().columns.tolist() == ["t (s)"]
+
+@pytest.mark.parametrize("n_points", [5, 0])
+def test_make_props_data_reads_the_body_from_the_column_names_line(tmp_path, n_points):
+    path = write_raw_file(tmp_path / "raw" / "2024-11-29" / "VVg_1.csv", n_points=n_points)
+    props, data = make_props_data(path, PROCEDURES)
+
+    with open(path) as file:
+        procedure, properties, header = read_header(file)
+        assert file.readline() == "Vg (V),VDS (V)\n"
+    assert procedure == "VVg"
+    assert properties == {"Sample": "A", "VG step": "0.1 V", "Start time": "1731364225.5"}
+    assert props.to_dict() == {
+        "Sample": "A",
+        "VG step": 0.1,
+        "Start time": 1731364225.5,
+        "data_key": "2024-11-29/VVg_1",
+        "Procedure type": "VVg",
+    }
+    # As read by reopening the file and skipping the header lines
+    expected = pd.read_csv(path, header=header, dtype=PROCEDURES["VVg"]["Data"])
+    pd.testing.assert_frame_equal(data, expected)
+    assert len(data) == n_points
+    assert data.dtypes.to_dict() == {"Vg (V)": float, "VDS (V)": float}
+
+
+def test_make_props_data_rejects_a_malformed_header(tmp_path):
+    path = write_raw_file(tmp_path / "raw" / "2024-11-29" / "VVg_1.csv")
+    with open(path) as file:
+        lines = file.read().splitlines()
+
+    with open(path, "w") as file:
+        file.write("\n".join(lines[:3] + ["#\tGate voltage: 1 V"] + lines[3:]) + "\n")
+    with pytest.raises(KeyError, match="Gate voltage"):
+        make_props_data(path, PROCEDURES)
+
+    with open(path, "w") as file:
+        file.write("\n".join(["#Procedure: VVg"] + lines[1:]) + "\n")
+    with pytest.warns(UserWarning), pytest.raises(KeyError, match="not found in procedures"):
+        make_props_data(path, PROCEDURES)
+
+def test_lazy_nanolab_dataset_gives_the_eager_properties_and_data(tmp_path):
+    path = write_raw_file(tmp_path / "raw" / "2024-11-29" / "VVg_1.csv")
+    procedures = {"VVg": {**PROCEDURES["VVg"], "Data": {"Vg (V)": "float32", "VDS (V)": "str"}}}
+    props, data = NanoLabDataSet(path, procedures=procedures, cache_dir=None).load()
+    lazy_props, load_data = NanoLabDataSet(path, procedures=procedures, lazy=True).load()
+
+    pd.testing.assert_series_equal(lazy_props, props)
+    lazy_data = load_data()
+    pd.testing.assert_frame_equal(lazy_data, data)
+    assert lazy_data.dtypes.to_dict() == {"Vg (V)": "float32", "VDS (V)": object}
+
+
+def test_ingest_project_keeps_the_outputs_of_an_unchanged_project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for i in range(2):
+        write_raw_file(tmp_path / "raw" / "2024-11-29" / f"VVg_{i}.csv")
+    raw_config = {"path": str(tmp_path / "raw"), "filename_suffix": ".csv"}
+    raw = PartitionedDataset(
+        dataset={"type": NanoLabDataSet, "procedures": PROCEDURES, "cache_dir": None}, **raw_config
+    )
+    ingestion = {"primary_format": "parquet"}
+    properties = PropertiesTableDataSet(filepath="data/03_primary/properties_project_T.csv")
+
+    props, data, manifest = ingest_project(raw.load(), ingestion, PROCEDURES, project="project_T", raw_config=raw_config)
+    assert len(props) == len(data) == len(manifest) == 2
+    properties.save(props)
+    ManifestDataSet(filepath="data/03_primary/manifest_project_T.json").save(manifest)
+    primary_dataset(primary_data_path("project_T", "parquet"), "parquet").save(data)
+    modified = os.path.getmtime(properties.filepath)
+
+    props, data, unchanged_manifest = ingest_project(
+        raw.load(), ingestion, PROCEDURES, project="project_T", raw_config=raw_config
+    )
+    assert props is UNCHANGED and data == {} and unchanged_manifest == manifest
+    properties.save(props)
+    assert os.path.getmtime(properties.filepath) == modified
+    assert len(properties.load()) == 2
+
+
+
+def test_manifest_dataset_is_empty_before_the_first_ingestion(tmp_path):
+    assert ManifestDataSet(filepath=str(tmp_path / "manifest_project_T.json")).load() == {}
+
+
+def test_every_manifest_read_by_the_CNP_calculations_is_written_by_the_ingestion():
+    pipeline = base_processing.create_pipeline() + CNP_calculations.create_pipeline()
+    manifests = {name for name in pipeline.all_inputs() if name.startswith("manifest_")}
+    assert manifests
+    assert manifests <= pipeline.all_outputs()
+
+def cache_entries(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(CACHE_SUFFIX))
+
+
+def test_parse_cache_hit_does_not_parse_the_data_again(tmp_path, monkeypatch):
+    path = write_raw_file(tmp_path / "raw" / "2024-11-29" / "VVg_1.csv")
+    cache_dir = str(tmp_path / "cache")
+    props, data = NanoLabDataSet(path, procedures=PROCEDURES, cache_dir=cache_dir).load()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The data was parsed again")
+
+    monkeypatch.setattr(nanolab_dataset, "read_body", fail)
+    cached_props, cached_data = NanoLabDataSet(path, procedures=PROCEDURES, cache_dir=cache_dir).load()
+    pd.testing.assert_series_equal(cached_props, props)
+    pd.testing.assert_frame_equal(cached_data, data)
+    assert len(cache_entries(cache_dir)) == 1
+
+
+def test_parse_cache_misses_after_a_schema_change(tmp_path):
+    path = write_raw_file(tmp_path / "raw" / "2024-11-29" / "VVg_1.csv")
+    cache_dir = str(tmp_path / "cache")
+    _, data = NanoLabDataSet(path, procedures=PROCEDURES, cache_dir=cache_dir).load()
+
+    changed = {"VVg": {**PROCEDURES["VVg"], "Data": {"Vg (V)": "float", "VDS (V)": "str"}}}
+    _, changed_data = NanoLabDataSet(path, procedures=changed, cache_dir=cache_dir).load()
+    assert data["VDS (V)"].dtype == float
+    assert changed_data["VDS (V)"].dtype == object
+    assert len(cache_entries(cache_dir)) == 2
+
+
+def test_parse_cache_gives_the_data_key_of_a_renamed_file(tmp_path):
+    path = write_raw_file(tmp_path / "raw" / "2024-11-29" / "VVg_1.csv")
+    renamed = tmp_path / "raw" / "2024-11-30" / "VVg_7.csv"
+    renamed.parent.mkdir()
+    shutil.copy(path, renamed)
+    cache_dir = str(tmp_path / "cache")
+
+    props, _ = NanoLabDataSet(path, procedures=PROCEDURES, cache_dir=cache_dir).load()
+    renamed_props, _ = NanoLabDataSet(str(renamed), procedures=PROCEDURES, cache_dir=cache_dir).load()
+    uncached_props, _ = NanoLabDataSet(str(renamed), procedures=PROCEDURES, cache_dir=None).load()
+    assert len(cache_entries(cache_dir)) == 1
+    assert renamed_props["data_key"] == uncached_props["data_key"] != props["data_key"]
+
+
+def test_parse_cache_evicts_the_least_recently_used_entries_over_its_cap(tmp_path):
+    value = (pd.Series({"Sample": "A"}), pd.DataFrame({"Vg (V)": range(1000)}))
+    cache_dir = str(tmp_path / "cache")
+    ParseCache(cache_dir).put("probe", value)
+    entry_size = os.path.getsize(os.path.join(cache_dir, "probe" + CACHE_SUFFIX))
+    shutil.rmtree(cache_dir)
+
+    # Room for three entries and a half: a fourth evicts a single entry
+    max_bytes = 3 * entry_size + entry_size // 2
+    cache = ParseCache(cache_dir, max_bytes=max_bytes)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, value)
+        os.utime(os.path.join(cache_dir, key + CACHE_SUFFIX), (i, i))
+    assert cache.get("a") is not None  # Now the most recently used
+    cache.put("d", value)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ["a", "c", "d"])
+    assert sum(os.path.getsize(os.path.join(cache_dir, name)) for name in cache_entries(cache_dir)) <= max_bytes
+
+
+@pytest.mark.parametrize("cache", [True, False])
+def test_start_time_is_unix_seconds_until_the_properties_are_consolidated(tmp_path, cache):
+    write_raw_file(tmp_path / "raw" / "2024-11-29" / "VVg_1.csv")
+    cache_dir = str(tmp_path / "cache") if cache else None
+    raw = PartitionedDataset(
+        path=str(tmp_path / "raw"),
+        dataset={"type": NanoLabDataSet, "procedures": PROCEDURES, "cache_dir": cache_dir},
+        filename_suffix=".csv",
+    )
+    for _ in range(2):  # A miss then a hit
+        props, _ = raw.load()["2024-11-29/VVg_1"]()
+        assert props["Start time"] == 1731364225.5
+        consolidated_props, _ = separate_nanolab_dataset(raw.load(), procedures=PROCEDURES)
+        assert consolidated_props["Start time"].iloc[0] == pd.Timestamp("2024-11-11 22:30:25.5")
+
+
+def test_separate_nanolab_dataset_converts_the_timestamps_of_custom_procedures(tmp_path):
+    # A procedure unknown to the default parameters file, with its own 'datetime' key
+    procedures = {"VVg": {**PROCEDURES["VVg"], "Metadata": {"Start time": "datetime", "End time": "datetime"}}}
+    props = pd.Series({"Start time": 1731364225.5, "End time": 1731364325.5, "Procedure type": "VVg", "data_key": "a"})
+    experiments = {"a": lambda: (props.copy(), pd.DataFrame())}
+
+    consolidated_props, _ = separate_nanolab_dataset(experiments, procedures=procedures)
+    assert consolidated_props["End time"].iloc[0] == pd.Timestamp("2024-11-11 22:32:05.5")
+
+
+def test_load_experiments_sends_the_procedures_to_workers_without_them(tmp_path, monkeypatch):
+    # Workers start with an empty procedures cache and no parameters file to fall back to
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(nanolab_dataframe, "_procedures_cache", {})
+    for i in range(2):
+        write_raw_file(tmp_path / "raw" / "2024-11-29" / f"VVg_{i}.csv")
+    experiments = PartitionedDataset(
+        path=str(tmp_path / "raw"),
+        dataset={"type": NanoLabDataSet, "cache_dir": None},
+        filename_suffix=".csv",
+    ).load()
+
+    _, errors = load_experiments(experiments, max_workers=2, executor="process")
+    assert len(errors) == 2
+    loaded, errors = load_experiments(experiments, max_workers=2, executor="process", procedures=PROCEDURES)
+    assert errors == {}
+    assert [props["Sample"] for props, _ in loaded.values()] == ["A", "A"]
@@ -0,0 +1,92 @@
+"""
+Tests of the rendering of the reporting figures (nanolab_processing_base.reporting).
+"""
+
+from functools import partial
+import importlib.util
+import sys
+import types
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+import nanolab_processing_base
+from nanolab_processing_base.extras.datasets.figure_file import FigureFileDataSet
+
+
+@pytest.fixture
+def reporting(monkeypatch):
+    """
+    The reporting module. It applies the nanoplot style when imported, and the style
+    does not matter here, so without nanoplot a module whose apply does nothing stands
+    in for it (inherited by the forked rendering workers). The stand-in and the module
+    imported with it are removed after the test.
+    """
+    if importlib.util.find_spec("nanoplot") is not None:
+        yield importlib.import_module("nanolab_processing_base.reporting")
+        return
+    nanoplot = types.ModuleType("nanoplot")
+    nanoplot.apply = lambda: None
+    monkeypatch.setitem(sys.modules, "nanoplot", nanoplot)
+    yield importlib.import_module("nanolab_processing_base.reporting")
+    sys.modules.pop("nanolab_processing_base.reporting", None)
+    if hasattr(nanolab_processing_base, "reporting"):
+        delattr(nanolab_processing_base, "reporting")
+
+
+def plot_values(values: np.ndarray, color: str):
+    fig, ax = plt.subplots()
+    ax.plot(values, color=color)
+    return fig
+
+
+def test_render_report_in_processes_gives_the_files_of_serial_rendering(reporting, tmp_path):
+    figures = [
+        reporting.ReportFigure(function=partial(plot_values, color=color), inputs=[name], output=f"{name}_plot")
+        for name, color in [("a", "red"), ("b", "blue"), ("c", "green")]
+    ]
+    inputs = [np.arange(5.0), np.arange(5.0) ** 2, -np.arange(5.0)]
+
+    serial = reporting.render_report({"max_workers": 1}, *inputs, figures=figures)
+    parallel = reporting.render_report({"max_workers": 2, "executor": "process"}, *inputs, figures=figures)
+
+    assert parallel == serial
+    assert len(set(serial)) == 3
+    dataset = FigureFileDataSet(filepath=str(tmp_path / "reports" / "a.pdf"))
+    dataset.save(serial[0])
+    assert dataset.load() == serial[0]
+
+
+def test_render_report_redraws_only_the_figures_whose_inputs_changed(reporting, tmp_path, monkeypatch):
+    drawn = []
+    monkeypatch.setattr(reporting, "render_figure", lambda job: drawn.append(job[1]) or b"%d" % len(drawn))
+    figures = [
+        reporting.ReportFigure(function=partial(plot_values, color="red"), inputs=[name], output=f"{name}_plot")
+        for name in ["a", "b"]
+    ]
+    parameters = {"max_workers": 1, "cache_dir": str(tmp_path / "render_cache")}
+
+    first = reporting.render_report(parameters, np.arange(3.0), np.arange(4.0), figures=figures)
+    second = reporting.render_report(parameters, np.arange(3.0), np.arange(4.0), figures=figures)
+    third = reporting.render_report(parameters, np.arange(3.0), np.arange(5.0), figures=figures)
+
+    assert len(drawn) == 3
+    assert second == first
+    assert third[0] == first[0] and third[1] != first[1]
+    assert len(list((tmp_path / "render_cache").iterdir())) == 2
+
+
+def test_report_bundle_renders_one_pdf_page_per_figure(reporting):
+    pages = [
+        reporting.ReportPage(function=partial(plot_values, color="red"), inputs=[name], title=name)
+        for name in ["a", "b", "c"]
+    ]
+    bundle = reporting.report_bundle(pages, output="bundle")
+
+    (content,) = reporting.render_report({}, np.arange(3.0), np.arange(4.0), np.arange(5.0), figures=[bundle])
+
+    assert bundle.inputs == ["a", "b", "c"]
+    assert content.startswith(b"%PDF")
+    assert content.count(b"/Type /Page ") == 3
+    assert plt.get_fignums() == []
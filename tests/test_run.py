@@ -12,6 +12,8 @@ from kedro.config import OmegaConfigLoader
 from kedro.framework.context import KedroContext
 from kedro.framework.hooks import _create_hook_manager
 
+from nanolab_processing_base import pipeline_registry
+
 
 @pytest.fixture
 def config_loader():
@@ -35,3 +37,19 @@ def project_context(config_loader):
 class TestProjectContext:
     def test_project_path(self, project_context):
         assert project_context.project_path == Path.cwd()
+
+
+def test_register_pipelines_skips_an_extra_pipeline_that_cannot_be_created(monkeypatch):
+    monkeypatch.setattr(pipeline_registry, "find_pipelines", lambda: {})
+    monkeypatch.setattr(
+        pipeline_registry,
+        "EXTRA_PIPELINES",
+        {
+            "CNP_calculations_batched": ("CNP_calculations", "create_batched_pipeline"),
+            "missing": ("CNP_calculations", "create_missing_pipeline"),
+        },
+    )
+
+    with pytest.warns(UserWarning, match="'missing' pipeline"):
+        pipelines = pipeline_registry.register_pipelines()
+    assert sorted(pipelines) == ["CNP_calculations_batched", "__default__"]